@@ -0,0 +1,96 @@
+import json
+import os
+import re
+import threading
+import time
+
+from result_cache import canonical_hash
+
+
+class AnalyticsSnapshotStore:
+    """Immutable, versioned snapshots of precomputed analytics, one series per kind
+
+    publish() writes each snapshot to its own file named after its version
+    and never overwrites an existing one; a small per-kind pointer file,
+    replaced atomically, names the latest version. Readers in another
+    process therefore see either the previous or the new snapshot, never a
+    partial one. Loaded snapshots are kept in memory and only re-read when
+    the pointer changes.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._loaded = {}  # kind -> (pointer signature, snapshot)
+        os.makedirs(root, exist_ok=True)
+
+    def _pointer_path(self, kind):
+        return os.path.join(self.root, f"{kind}.latest.json")
+
+    def path(self, kind, version):
+        return os.path.join(self.root, re.sub(r'[^A-Za-z0-9._-]', '_', f"{kind}-{version}") + ".json")
+
+    def publish(self, kind, data, data_version, meta=None):
+        """Write a snapshot of data (JSON-serializable) and make it the latest; returns its version
+
+        The version combines data_version (e.g. the trading day) with a
+        hash of the content, so republishing identical results is a no-op.
+        """
+        version = f"{data_version}-{canonical_hash(data)[:12]}"
+        snapshot = {
+            'kind': kind,
+            'version': version,
+            'data_version': data_version,
+            'created_at': time.time(),
+            'meta': meta or {},
+            'data': data
+        }
+        path = self.path(kind, version)
+        if not os.path.exists(path):
+            self._write_json(path, snapshot)
+        self._write_json(self._pointer_path(kind), {'version': version, 'file': os.path.basename(path)})
+        return version
+
+    @staticmethod
+    def _write_json(path, value):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+        os.replace(tmp_path, path)
+
+    def latest(self, kind):
+        """Latest snapshot of a kind with its current age_seconds, or None if none was published"""
+        pointer_path = self._pointer_path(kind)
+        try:
+            stat = os.stat(pointer_path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            loaded = self._loaded.get(kind)
+        if loaded is None or loaded[0] != signature:
+            try:
+                with open(pointer_path, 'r', encoding='utf-8') as f:
+                    pointer = json.load(f)
+                with open(os.path.join(self.root, pointer['file']), 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError, KeyError) as e:
+                # Keep serving the snapshot already loaded, if any
+                print(f"⚠️ Could not read the latest {kind} snapshot: {e}")
+                if loaded is None:
+                    return None
+            else:
+                loaded = (signature, snapshot)
+                with self._lock:
+                    self._loaded[kind] = loaded
+
+        snapshot = loaded[1]
+        return dict(snapshot, age_seconds=max(time.time() - snapshot['created_at'], 0.0))
+
+    def describe(self, kind):
+        """Version, data version and age of the latest snapshot, without the data"""
+        snapshot = self.latest(kind)
+        if snapshot is None:
+            return None
+        return {key: snapshot[key] for key in ('version', 'data_version', 'created_at', 'age_seconds', 'meta')}
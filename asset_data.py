@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+
+def read_table(path, **kwargs):
+    """Read a CSV or Parquet table, memory-mapping the file where the reader supports it"""
+    if str(path).lower().endswith((".parquet", ".pq")):
+        try:
+            return pd.read_parquet(path, memory_map=True, **kwargs)
+        except ImportError:
+            raise ValueError(f"Reading {path} needs pyarrow; provide a CSV file instead.")
+    return pd.read_csv(path, memory_map=True, **kwargs)
+
+
+class AssetDataSnapshot:
+    """Immutable bundle of asset data and everything derived from it
+
+    A snapshot is built completely before it is published, and requests keep
+    the snapshot they started with, so a reload never mixes old and new data
+    within one result. Attributes cannot be reassigned; the contained dicts
+    and frames are shared and must be treated as read-only.
+    """
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "loaded_at", time.time())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AssetDataSnapshot is immutable; build a new snapshot instead.")
+
+
+class DataFileWatcher:
+    """Polls data files for changes and calls on_change when any of them is modified
+
+    Uses (mtime, size) signatures so no extra dependency is needed. Errors
+    raised by on_change are reported and the previous state is kept; the
+    next modification triggers another attempt.
+    """
+
+    def __init__(self, paths, on_change, interval=5.0):
+        self.paths = [p for p in paths if p]
+        self.on_change = on_change
+        self.interval = interval
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def check(self):
+        """Call on_change if any file changed since the last check; returns True if it did"""
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"⚠️ Reloading data after a file change failed: {e}")
+        return True
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="data-file-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class AssetUniverse:
+    """Fixed asset index with per-asset attributes held as contiguous arrays
+
+    Weights are vectors (or (portfolios x assets) matrices) in the order of
+    `assets`, so every portfolio metric is a dot product. Arrays are
+    read-only; build a new universe when the asset data changes.
+    """
+
+    ATTRIBUTES = ("cagr", "volatility", "beta", "liquidity", "tax_rate", "stress_impact")
+
+    def __init__(self, assets, cagr, volatility, beta, liquidity, tax_rate, stress_impact):
+        self.assets = tuple(assets)
+        self.index = {asset: i for i, asset in enumerate(self.assets)}
+        for name, values in zip(self.ATTRIBUTES, (cagr, volatility, beta, liquidity, tax_rate, stress_impact)):
+            array = np.ascontiguousarray(values, dtype=float)
+            if array.shape != (len(self.assets),):
+                raise ValueError(f"{name} must have one value per asset.")
+            array.flags.writeable = False
+            setattr(self, name, array)
+
+    @classmethod
+    def from_dicts(cls, investment_data, tax_rates=None, stress_impacts=None):
+        """Build from {asset: {"cagr", "volatility", "beta", "liquidity"}} style dicts
+
+        Missing attributes are 0. Assets without an entry in tax_rates get a
+        NaN tax rate, meaning the investor's own tax bracket applies.
+        """
+        assets = list(investment_data.keys())
+        tax_rates = tax_rates or {}
+        stress_impacts = stress_impacts or {}
+
+        def column(name):
+            return [investment_data[a].get(name, 0) for a in assets]
+
+        return cls(
+            assets, column("cagr"), column("volatility"), column("beta"), column("liquidity"),
+            [tax_rates.get(a, np.nan) for a in assets],
+            [stress_impacts.get(a, 0) for a in assets]
+        )
+
+    def __len__(self):
+        return len(self.assets)
+
+    def weights_vector(self, weights):
+        """Weights dict (unknown assets ignored) or array as a vector in asset order"""
+        if isinstance(weights, dict):
+            vector = np.zeros(len(self.assets))
+            for asset, weight in weights.items():
+                if asset in self.index:
+                    vector[self.index[asset]] = weight
+            return vector
+        return np.asarray(weights, dtype=float)
+
+    def weights_matrix(self, weight_sets):
+        """(portfolios x assets) matrix from a list of weight dicts or vectors"""
+        return np.array([self.weights_vector(w) for w in weight_sets], dtype=float).reshape(-1, len(self.assets))
+
+    def weights_dict(self, vector):
+        """Vector in asset order back to an {asset: weight} dict"""
+        return {asset: float(w) for asset, w in zip(self.assets, vector)}
+
+    def effective_tax_rates(self, tax_bracket):
+        """Per-asset tax rates, with the bracket(s) filling assets without a fixed rate
+
+        A scalar bracket gives a vector; an array of brackets gives one row per bracket.
+        """
+        tax_bracket = np.asarray(tax_bracket, dtype=float)
+        return np.where(np.isnan(self.tax_rate), tax_bracket[..., None], self.tax_rate)
+
+    def portfolio_metrics(self, weights, tax_bracket=0.0):
+        """Weighted cagr, tax-adjusted cagr, volatility, beta, liquidity and stress impact
+
+        weights is a single vector/dict or a (portfolios x assets) matrix; the
+        results are scalars or arrays accordingly. tax_bracket may be a scalar
+        or one value per portfolio.
+        """
+        weights = self.weights_vector(weights)
+        return {
+            "cagr": weights @ self.cagr,
+            "tax_adj_cagr": np.sum(weights * self.cagr * (1 - self.effective_tax_rates(tax_bracket)), axis=-1),
+            "volatility": weights @ self.volatility,
+            "beta": weights @ self.beta,
+            "liquidity": weights @ self.liquidity,
+            "stress_impact": weights @ self.stress_impact
+        }
@@ -1,5 +1,6 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
+import io
 import json
 import sys
 import os
@@ -10,6 +11,8 @@ import requests
 import math
 import random
 import smtplib
+import numpy as np
+import pandas as pd
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
@@ -35,6 +38,18 @@ except ImportError:
     PortfolioOptimizer = None
     print("⚠️ portfolio_optimizer module not found, some features may be limited")
 
+try:
+    from saved_plans import PlanStore, SavedPlans
+except ImportError:
+    PlanStore = SavedPlans = None
+    print("⚠️ saved_plans module not found, some features may be limited")
+
+try:
+    from analytics_snapshots import AnalyticsSnapshotStore
+except ImportError:
+    AnalyticsSnapshotStore = None
+    print("⚠️ analytics_snapshots module not found, some features may be limited")
+
 app = Flask(__name__)
 
 # CORS configuration for production
@@ -49,6 +64,20 @@ JWT_EXPIRE_MINUTES = 60 * 24
 # Simple JSON storage for demo users
 USERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.json')
 
+# SQLite store of per-user saved plans
+PLANS_DB = os.environ.get('PLANS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_plans.db'))
+
+# Market analytics snapshots published by scheduler.py; with PRECOMPUTED_ANALYTICS=1
+# the API never downloads prices itself and analyzes custom ranges from the price cache.
+# PRECOMPUTED_ANALYTICS defaults to 0, in which case cache misses still call yfinance
+# from the request path. The scheduler runs as a separate process, so ANALYTICS_SNAPSHOT_DIR
+# and EQUITY_PRICE_CACHE_DIR must point at storage both processes mount (the defaults
+# under backend/ are only shared when both run on the same machine).
+ANALYTICS_SNAPSHOT_DIR = os.environ.get(
+    'ANALYTICS_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analytics_snapshots')
+)
+PRECOMPUTED_ANALYTICS = os.environ.get('PRECOMPUTED_ANALYTICS', '0') == '1'
+
 
 def load_users():
     if not os.path.exists(USERS_FILE):
@@ -158,9 +187,17 @@ def jwt_required(f):
     return decorated_function
 
 # Initialize our tools (with fallback if modules don't exist)
-investment_guide = InvestmentGuide() if InvestmentGuide else None
+investment_guide = InvestmentGuide(offline=True if PRECOMPUTED_ANALYTICS else None) if InvestmentGuide else None
+analytics_snapshots = AnalyticsSnapshotStore(ANALYTICS_SNAPSHOT_DIR) if AnalyticsSnapshotStore else None
+if PRECOMPUTED_ANALYTICS and analytics_snapshots and analytics_snapshots.describe('equity') is None:
+    print(f"⚠️ PRECOMPUTED_ANALYTICS=1 but no equity snapshot in {ANALYTICS_SNAPSHOT_DIR}; "
+          "is it on a volume shared with scheduler.py?")
 portfolio_optimizer = PortfolioOptimizer() if PortfolioOptimizer else None
 
+# Hot-reload asset data files without restarting the server
+if portfolio_optimizer and os.environ.get('PORTFOLIO_DATA_WATCH', '1') != '0':
+    portfolio_optimizer.start_data_watcher()
+
 @app.route('/')
 def home():
     return jsonify({
@@ -169,6 +206,12 @@ def home():
             "investment_analysis": "/api/investment/analyze",
             "budget_optimization": "/api/budget/optimize",
             "portfolio_optimization": "/api/portfolio/optimize",
+            "portfolio_batch_optimization": "/api/portfolio/optimize-batch",
+            "portfolio_stress_test": "/api/portfolio/stress-test",
+            "portfolio_profile_comparison": "/api/portfolio/compare-profiles",
+            "portfolio_goal_seek": "/api/portfolio/goal-seek",
+            "portfolio_sensitivity_sweep": "/api/portfolio/sweep",
+            "saved_plans": "/api/plans",
             "investment_recommendations": "/api/investment/recommendations",
             "auth_signup": "/api/auth/signup",
             "auth_login": "/api/auth/login",
@@ -312,22 +355,42 @@ def analyze_investments():
         data = request.get_json()
         analysis_type = data.get('type', 'fixed_deposits')
         
+        if analysis_type in ('fixed_deposits', 'equity'):
+            # Serve the scheduler's latest snapshot when the default analysis is requested
+            snapshot = None
+            if analytics_snapshots and not (data.get('start_date') or data.get('end_date')):
+                snapshot = analytics_snapshots.latest(analysis_type)
+            if snapshot is not None:
+                return jsonify({
+                    'success': True,
+                    'type': analysis_type,
+                    'data': snapshot['data'],
+                    'download': snapshot['meta'].get('download'),
+                    'snapshot': {key: snapshot[key] for key in ('version', 'data_version', 'created_at', 'age_seconds')}
+                })
+        
         if analysis_type == 'fixed_deposits':
             results = investment_guide.analyze_fixed_deposits()
             return jsonify({
                 'success': True,
                 'type': 'fixed_deposits',
-                'data': results.to_dict('records') if not results.empty else []
+                'data': results.to_dict('records') if not results.empty else [],
+                'snapshot': None
             })
         
         elif analysis_type == 'equity':
             start_date = data.get('start_date')
             end_date = data.get('end_date')
-            results = investment_guide.analyze_equity(start_date, end_date)
+            results, download_report, cache_info = investment_guide.analyze_equity_cached(
+                start_date, end_date, data.get('deadline')
+            )
             return jsonify({
                 'success': True,
                 'type': 'equity',
-                'data': results.to_dict('records') if not results.empty else []
+                'data': results.to_dict('records'),
+                'download': download_report,
+                'cache': cache_info,
+                'snapshot': None
             })
         
         else:
@@ -342,6 +405,25 @@ def analyze_investments():
             'error': str(e)
         }), 500
 
+@app.route('/api/investment/snapshots', methods=['GET'])
+def investment_snapshots():
+    """Version and age of the latest published analytics snapshots"""
+    return jsonify({
+        'success': True,
+        'snapshots': {
+            kind: analytics_snapshots.describe(kind) if analytics_snapshots else None
+            for kind in ('equity', 'fixed_deposits')
+        }
+    })
+
+@app.route('/api/investment/cache-stats', methods=['GET'])
+def investment_cache_stats():
+    """Hit/miss counters of the equity analysis cache"""
+    return jsonify({
+        'success': True,
+        'cache': investment_guide.equity_cache.stats()
+    })
+
 @app.route('/api/investment/recommendations', methods=['POST'])
 def get_investment_recommendations():
     """Get personalized investment recommendations"""
@@ -374,41 +456,13 @@ def optimize_budget():
     try:
         data = request.get_json()
         
-        # Create budget optimizer instance
-        optimizer = BudgetOptimizer(
-            monthly_income=data.get('monthly_income', 0),
-            irregular_income=data.get('irregular_income', 0),
-            irregular_freq=data.get('irregular_freq', 'monthly'),
-            outstanding_loans=data.get('outstanding_loans', 0),
-            emi=data.get('emi', 0),
-            food_input=data.get('food_expenses', 0),
-            leisure_input=data.get('leisure_expenses', 0),
-            travel_input=data.get('travel_expenses', 0),
-            fixed_costs=data.get('fixed_costs', 0),
-            savings_input=data.get('current_savings', 0),
-            monthly_savings_goal=data.get('savings_goal', 0),
-            goal=data.get('goal', 'Save More'),
-            extra_emi=data.get('extra_emi', 0),
-            interest_rate=data.get('interest_rate', 0),
-            loan_tenure=data.get('loan_tenure', 0),
-            financial_goal_amount=data.get('financial_goal_amount', 0),
-            months_to_goal=data.get('months_to_goal', 0)
-        )
-        
-        # Optimize budget
-        optimized_budget = optimizer.optimize_budget()
-        
-        # Get comprehensive analysis
-        analysis = optimizer.get_budget_analysis()
-        
-        # Get financial goal progress if applicable
-        goal_progress = optimizer.calculate_financial_goal_progress()
+        budget_plan = run_budget_plan(data)
         
         return jsonify({
             'success': True,
-            'optimized_budget': optimized_budget,
-            'analysis': analysis,
-            'goal_progress': goal_progress
+            'optimized_budget': budget_plan['optimized_budget'],
+            'analysis': budget_plan['analysis'],
+            'goal_progress': budget_plan['goal_progress']
         })
         
     except Exception as e:
@@ -417,27 +471,157 @@ def optimize_budget():
             'error': str(e)
         }), 500
 
+
+def run_budget_plan(data):
+    """Run the budget optimizer on request data and collect its outputs"""
+    # Create budget optimizer instance
+    optimizer = BudgetOptimizer(
+        monthly_income=data.get('monthly_income', 0),
+        irregular_income=data.get('irregular_income', 0),
+        irregular_freq=data.get('irregular_freq', 'monthly'),
+        outstanding_loans=data.get('outstanding_loans', 0),
+        emi=data.get('emi', 0),
+        food_input=data.get('food_expenses', 0),
+        leisure_input=data.get('leisure_expenses', 0),
+        travel_input=data.get('travel_expenses', 0),
+        fixed_costs=data.get('fixed_costs', 0),
+        savings_input=data.get('current_savings', 0),
+        monthly_savings_goal=data.get('savings_goal', 0),
+        goal=data.get('goal', 'Save More'),
+        extra_emi=data.get('extra_emi', 0),
+        interest_rate=data.get('interest_rate', 0),
+        loan_tenure=data.get('loan_tenure', 0),
+        financial_goal_amount=data.get('financial_goal_amount', 0),
+        months_to_goal=data.get('months_to_goal', 0)
+    )
+    
+    # Optimize budget
+    optimized_budget = optimizer.optimize_budget()
+    
+    # Get comprehensive analysis
+    analysis = optimizer.get_budget_analysis()
+    
+    # Get financial goal progress if applicable
+    goal_progress = optimizer.calculate_financial_goal_progress()
+    
+    return {
+        'optimized_budget': optimized_budget,
+        'analysis': analysis,
+        'goal_progress': goal_progress
+    }
+
+
+SIMULATION_OPTION_DEFAULTS = {
+    "seed": None,
+    "simulation_mode": 'blended',
+    "num_simulations": None,
+    "percentiles": None,
+    "variance_reduction": None,
+    "control_variate": False,
+    "tolerance": None,
+    "monthly_contribution": None,
+    "sip_step_up": None,
+    "rebalancing": None,
+    "rebalance_threshold": None,
+    "bootstrap_method": None,
+    "block_length": None,
+    "histogram": False,
+    "histogram_bins": None,
+    "histogram_log_bins": False
+}
+
+
+def build_portfolio_inputs(data):
+    """Prepare user inputs for portfolio optimization from request data"""
+    return {
+        "age": data.get('age', 30),
+        "annual_income": data.get('annual_income', 1000000),
+        "total_savings": data.get('total_savings', 750000),
+        "monthly_expenses": data.get('monthly_expenses', 30000),
+        "investment_amount": data.get('investment_amount', 500000),
+        "investment_horizon": data.get('investment_horizon', 10),
+        "risk_tolerance": data.get('risk_tolerance', 'moderate'),
+        "financial_goal": data.get('financial_goal', 1000000),
+        "investment_experience": data.get('investment_experience', 'intermediate'),
+        "liquidity_needs": data.get('liquidity_needs', 'moderate'),
+        "tax_bracket": data.get('tax_bracket', 0.125),
+        "expected_inflation": data.get('expected_inflation', 0.06),
+        "allocation_method": data.get('allocation_method', 'rules')
+    }
+
+
+# Types of the simulation options that are not free-form strings
+SIMULATION_OPTION_TYPES = {
+    "seed": int,
+    "num_simulations": int,
+    "percentiles": list,
+    "control_variate": bool,
+    "tolerance": float,
+    "monthly_contribution": float,
+    "sip_step_up": float,
+    "rebalance_threshold": float,
+    "block_length": int,
+    "histogram": bool,
+    "histogram_bins": int,
+    "histogram_log_bins": bool
+}
+
+
+def build_simulation_options(data):
+    """Extract Monte Carlo settings from request data"""
+    return {key: data.get(key, default) for key, default in SIMULATION_OPTION_DEFAULTS.items()}
+
+
+def parse_simulation_options(options):
+    """Convert string-valued simulation options (CSV, form or query data) to their types; raises ValueError"""
+    parsed = dict(options)
+    for key, kind in SIMULATION_OPTION_TYPES.items():
+        value = parsed.get(key)
+        if not isinstance(value, str):
+            continue
+        text = value.strip().lower()
+        if not text:
+            parsed[key] = SIMULATION_OPTION_DEFAULTS[key]
+        elif kind is bool:
+            if text not in ('true', 'false', '1', '0', 'yes', 'no'):
+                raise ValueError(f"{key} must be true or false.")
+            parsed[key] = text in ('true', '1', 'yes')
+        else:
+            try:
+                parsed[key] = [float(p) for p in text.split(',')] if kind is list else kind(text)
+            except ValueError:
+                expected = {int: "an integer", float: "a number", list: "a comma-separated list of numbers"}[kind]
+                raise ValueError(f"{key} must be {expected}.") from None
+    return parsed
+
+
 @app.route('/api/portfolio/optimize', methods=['POST'])
 def optimize_portfolio():
     """Optimize investment portfolio"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         
-        # Prepare user inputs for portfolio optimization
-        user_inputs = {
-            "age": data.get('age', 30),
-            "annual_income": data.get('annual_income', 1000000),
-            "total_savings": data.get('total_savings', 750000),
-            "monthly_expenses": data.get('monthly_expenses', 30000),
-            "investment_amount": data.get('investment_amount', 500000),
-            "investment_horizon": data.get('investment_horizon', 10),
-            "risk_tolerance": data.get('risk_tolerance', 'moderate'),
-            "financial_goal": data.get('financial_goal', 1000000),
-            "investment_experience": data.get('investment_experience', 'intermediate'),
-            "liquidity_needs": data.get('liquidity_needs', 'moderate'),
-            "tax_bracket": data.get('tax_bracket', 0.125),
-            "expected_inflation": data.get('expected_inflation', 0.06)
-        }
+        user_inputs = build_portfolio_inputs(data)
+        user_inputs.update(build_simulation_options(data))
+        user_inputs["fan_chart"] = data.get('fan_chart', False)
+        
+        # Binary float32 export of the simulated terminal values
+        if (data.get('export') or request.args.get('format')) == 'npy':
+            try:
+                final_values = portfolio_optimizer.simulate_terminal_values(user_inputs)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            buffer = io.BytesIO()
+            np.save(buffer, final_values)
+            buffer.seek(0)
+            response = send_file(buffer, mimetype='application/octet-stream', as_attachment=True,
+                                 download_name='terminal_values.npy')
+            response.headers['X-Data-Version'] = portfolio_optimizer.data_version
+            response.headers['X-Num-Simulations'] = str(len(final_values))
+            return response
         
         # Optimize portfolio
         results = portfolio_optimizer.optimize_portfolio(user_inputs)
@@ -459,6 +643,236 @@ def optimize_portfolio():
             'error': str(e)
         }), 500
 
+@app.route('/api/portfolio/optimize-batch', methods=['POST'])
+def optimize_portfolio_batch():
+    """Optimize portfolios for a list or CSV upload of investor profiles"""
+    try:
+        if 'file' in request.files:
+            rows = pd.read_csv(request.files['file']).to_dict('records')
+            data = request.form.to_dict()
+        elif request.content_type and request.content_type.startswith('text/csv'):
+            rows = pd.read_csv(io.StringIO(request.get_data(as_text=True))).to_dict('records')
+            data = request.args.to_dict()
+        else:
+            data = request.get_json() or {}
+            rows = data.get('inputs', [])
+        
+        if not isinstance(rows, list) or not rows:
+            return jsonify({
+                'success': False,
+                'error': 'Provide a non-empty "inputs" list or a CSV file'
+            }), 400
+        
+        # Empty CSV cells fall back to the same defaults as the single endpoint
+        rows = [{k: v for k, v in row.items() if v == v and v is not None} for row in rows]
+        batch_inputs = [build_portfolio_inputs(row) for row in rows]
+        try:
+            sim_options = parse_simulation_options(build_simulation_options(data))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        results = portfolio_optimizer.optimize_many(batch_inputs, sim_options)
+        
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'error_count': sum(1 for r in results if 'error' in r),
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/portfolio/compare-profiles', methods=['POST'])
+def compare_portfolio_profiles():
+    """Compare risk/experience profiles on common random numbers"""
+    try:
+        data = request.get_json() or {}
+        
+        user_inputs = build_portfolio_inputs(data)
+        user_inputs.update(build_simulation_options(data))
+        
+        results = portfolio_optimizer.compare_profiles(user_inputs, data.get('profiles'))
+        
+        if 'error' in results:
+            return jsonify({
+                'success': False,
+                'error': results['error']
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/portfolio/goal-seek', methods=['POST'])
+def portfolio_goal_seek():
+    """Solve for investment amount, horizon or monthly SIP to hit a target probability"""
+    try:
+        data = request.get_json() or {}
+        
+        user_inputs = build_portfolio_inputs(data)
+        user_inputs.update(build_simulation_options(data))
+        
+        results = portfolio_optimizer.goal_seek(
+            user_inputs,
+            solve_for=data.get('solve_for', 'investment_amount'),
+            target_probability=float(data.get('target_probability', 0.9))
+        )
+        
+        if 'error' in results:
+            return jsonify({
+                'success': False,
+                'error': results['error']
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/portfolio/sweep', methods=['POST'])
+def portfolio_sensitivity_sweep():
+    """Sweep one or two inputs (e.g. horizon x inflation) for interactive sliders"""
+    try:
+        data = request.get_json() or {}
+        
+        user_inputs = build_portfolio_inputs(data)
+        user_inputs.update(build_simulation_options(data))
+        
+        # e.g. {"investment_horizon": [5, 10, 15], "expected_inflation": [0.04, 0.06]}
+        results = portfolio_optimizer.sensitivity_sweep(user_inputs, data.get('grid') or {})
+        
+        if 'error' in results:
+            return jsonify({
+                'success': False,
+                'error': results['error']
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/portfolio/stress-test', methods=['POST'])
+def portfolio_stress_test():
+    """Evaluate one or many portfolios against the stress scenario library"""
+    try:
+        data = request.get_json() or {}
+        portfolios = data.get('portfolios') or [data.get('weights', {})]
+        
+        with portfolio_optimizer.pinned_snapshot() as snapshot:
+            # Weights are fractions per avenue, e.g. {"Equity": 0.6, "Gold": 0.4}
+            assets = list(snapshot.stress_scenarios.columns)
+            weight_matrix = [[float(p.get(a, 0)) for a in assets] for p in portfolios]
+            scenario_names, drawdowns = portfolio_optimizer.stress_test_scenarios(
+                weight_matrix, data.get('scenarios')
+            )
+        
+        return jsonify({
+            'success': True,
+            'data_version': snapshot.data_version,
+            'scenario_descriptions': snapshot.stress_descriptions,
+            'results': [portfolio_optimizer.summarize_stress(scenario_names, row) for row in drawdowns]
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/portfolio/cache-stats', methods=['GET'])
+def portfolio_cache_stats():
+    """Hit/miss counters of the portfolio result cache"""
+    return jsonify({
+        'success': True,
+        'data_version': portfolio_optimizer.data_version,
+        'cache': portfolio_optimizer.result_cache.stats()
+    })
+
+def run_portfolio_plan(data):
+    """Optimize a portfolio for saved-plan inputs, raising ValueError on invalid inputs"""
+    user_inputs = build_portfolio_inputs(data)
+    user_inputs.update(build_simulation_options(data))
+    user_inputs["fan_chart"] = data.get('fan_chart', False)
+    results = portfolio_optimizer.optimize_portfolio(user_inputs)
+    if 'error' in results:
+        raise ValueError(results['error'])
+    return results
+
+
+# Saved plans: portfolio plans go stale when the asset data version changes
+saved_plans = None
+if SavedPlans and portfolio_optimizer:
+    saved_plans = SavedPlans(PlanStore(PLANS_DB))
+    saved_plans.register('portfolio', run_portfolio_plan, lambda: portfolio_optimizer.data_version, seeded=True)
+    if BudgetOptimizer:
+        saved_plans.register('budget', run_budget_plan)
+    portfolio_optimizer.reload_listeners.append(saved_plans.request_refresh)
+
+@app.route('/api/plans', methods=['GET'])
+@jwt_required
+def list_saved_plans(current_user):
+    """All saved plans of the current user, for the dashboard"""
+    try:
+        return jsonify({
+            'success': True,
+            'plans': saved_plans.get_user_plans(current_user['email']),
+            'last_refresh': saved_plans.last_refresh
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/plans/<kind>', methods=['GET', 'PUT', 'DELETE'])
+@jwt_required
+def saved_plan(current_user, kind):
+    """Read, save (recomputing only when dirty) or delete one saved plan"""
+    try:
+        email = current_user['email']
+        if request.method == 'PUT':
+            data = request.get_json() or {}
+            plan = saved_plans.save_plan(email, kind, data.get('inputs') or {})
+        elif request.method == 'DELETE':
+            if not saved_plans.store.delete(email, kind):
+                return jsonify({'success': False, 'error': 'Plan not found'}), 404
+            return jsonify({'success': True})
+        else:
+            plan = saved_plans.get_plan(email, kind)
+        
+        if plan is None:
+            return jsonify({'success': False, 'error': 'Plan not found'}), 404
+        return jsonify({'success': True, 'plan': plan})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/chatbot/query', methods=['POST'])
 def chatbot_query():
     """Handle AI chatbot queries"""
@@ -1297,6 +1711,7 @@ if __name__ == '__main__':
     print("   - POST /api/investment/analyze - Investment analysis")
     print("   - POST /api/budget/optimize - Budget optimization")
     print("   - POST /api/portfolio/optimize - Portfolio optimization")
+    print("   - POST /api/portfolio/optimize-batch - Batch portfolio optimization")
     print("   - POST /api/chatbot/query - AI chatbot")
     print("   - POST /api/errors/log - Error logging")
     print("   - POST /api/analytics/track - Analytics tracking")
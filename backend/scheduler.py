@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Ghar Ka Guide - Market Analytics Scheduler
+Runs the equity and fixed deposit analyses after the NSE close on trading days
+and publishes them as immutable versioned snapshots, which the API serves
+directly instead of downloading prices during user requests.
+
+Run it as its own process next to the API (see Procfile). The two processes
+exchange data only through ANALYTICS_SNAPSHOT_DIR and EQUITY_PRICE_CACHE_DIR, so
+both must point at a volume that the scheduler and every API instance mount;
+separate dynos or containers do not share their local filesystems. Set
+PRECOMPUTED_ANALYTICS=1 on the API to stop it downloading prices itself.
+
+    python scheduler.py          # publish after every close
+    python scheduler.py --once   # publish the latest session now and exit
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+from zoneinfo import ZoneInfo
+
+# Add current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from investment_guide import InvestmentGuide
+from analytics_snapshots import AnalyticsSnapshotStore
+
+# Shared with the API process (see app.py)
+SNAPSHOT_DIR = os.environ.get(
+    'ANALYTICS_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analytics_snapshots')
+)
+
+# NSE closes at 15:30 IST; run once closing prices have settled
+MARKET_TIMEZONE = ZoneInfo(os.environ.get('MARKET_TIMEZONE', 'Asia/Kolkata'))
+RUN_AT = os.environ.get('ANALYTICS_RUN_AT', '16:30')
+EQUITY_DEADLINE = float(os.environ.get('ANALYTICS_EQUITY_DEADLINE', 600))
+RETRY_MINUTES = float(os.environ.get('ANALYTICS_RETRY_MINUTES', 30))
+EQUITY_HISTORY_YEARS = 5
+
+
+def run_time(day):
+    hour, minute = map(int, RUN_AT.split(':'))
+    return datetime.datetime.combine(day, datetime.time(hour, minute), tzinfo=MARKET_TIMEZONE)
+
+
+def last_session(now):
+    """Most recent weekday whose scheduled run time has passed (exchange holidays are not modelled)"""
+    day = now.date()
+    if now < run_time(day):
+        day -= datetime.timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= datetime.timedelta(days=1)
+    return day
+
+
+def next_run(now):
+    day = last_session(now) + datetime.timedelta(days=1)
+    while day.weekday() >= 5:
+        day += datetime.timedelta(days=1)
+    return run_time(day)
+
+
+def publish_session(guide, store, session):
+    """Analyze one trading session and publish both snapshots; returns True if a complete equity snapshot was published"""
+    session_label = session.strftime('%Y-%m-%d')
+
+    fixed_deposits = guide.analyze_fixed_deposits()
+    version = store.publish('fixed_deposits', fixed_deposits.to_dict('records'), session_label)
+    print(f"✅ Published fixed deposit snapshot {version}")
+
+    # end_date is exclusive, so include the session's own closing bar
+    start_date = (session - datetime.timedelta(days=EQUITY_HISTORY_YEARS * 365)).strftime('%Y-%m-%d')
+    end_date = (session + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+    equity = guide.analyze_equity(start_date, end_date, EQUITY_DEADLINE)
+    report = guide.last_download_report
+    if equity.empty:
+        print(f"⚠️ Equity analysis for {session_label} produced no results; keeping the previous snapshot")
+        return False
+    # A partial universe is still published, but marked so the session is retried
+    complete = not report['timed_out'] and not report['failed']
+    version = store.publish('equity', equity.to_dict('records'), session_label, {
+        'start_date': start_date,
+        'end_date': end_date,
+        'complete': complete,
+        'download': report
+    })
+    if not complete:
+        print(f"⚠️ Published partial equity snapshot {version} ({len(report['timed_out'])} timed out, "
+              f"{len(report['failed'])} failed); retrying")
+        return False
+    print(f"✅ Published equity snapshot {version} "
+          f"({report['completed']}/{report['requested']} tickers in {report['elapsed_seconds']:.1f}s)")
+    return True
+
+
+def run_forever(guide, store):
+    while True:
+        now = datetime.datetime.now(MARKET_TIMEZONE)
+        session = last_session(now)
+        latest = store.describe('equity')
+        if (latest is None or latest['data_version'] < session.strftime('%Y-%m-%d')
+                or not latest['meta'].get('complete', True)):
+            try:
+                published = publish_session(guide, store, session)
+            except Exception as e:
+                print(f"❌ Publishing analytics for {session} failed: {e}")
+                published = False
+            if not published:
+                time.sleep(RETRY_MINUTES * 60)
+                continue
+
+        wake_at = next_run(now)
+        print(f"⏰ Next run at {wake_at.isoformat()}")
+        time.sleep(max((wake_at - datetime.datetime.now(MARKET_TIMEZONE)).total_seconds(), 0) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish precomputed market analytics snapshots")
+    parser.add_argument('--once', action='store_true', help="publish the latest session now and exit")
+    args = parser.parse_args()
+
+    guide = InvestmentGuide(offline=False)
+    store = AnalyticsSnapshotStore(SNAPSHOT_DIR)
+    print(f"📈 Analytics snapshots in {SNAPSHOT_DIR}, runs at {RUN_AT} {MARKET_TIMEZONE.key} on weekdays")
+
+    if args.once:
+        session = last_session(datetime.datetime.now(MARKET_TIMEZONE))
+        sys.exit(0 if publish_session(guide, store, session) else 1)
+    run_forever(guide, store)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import numpy as np
+from scipy.optimize import minimize
+
+
+class EfficientFrontier:
+    """Mean-variance efficient frontier precomputed on a dense grid of target returns
+
+    The frontier is solved once (long-only, fully invested, optional excluded
+    assets) and stored as sorted arrays, so per-request allocation is a
+    binary search plus linear interpolation between neighbouring frontier
+    portfolios instead of a solver call.
+    """
+
+    def __init__(self, assets, means, covariance, excluded=(), num_points=101):
+        self.assets = list(assets)
+        self.means = np.asarray(means, dtype=float)
+        self.covariance = np.asarray(covariance, dtype=float)
+        self.excluded = set(excluded)
+        self.num_points = num_points
+        self.returns, self.volatilities, self.weights = self._solve()
+
+    def _solve(self):
+        n = len(self.assets)
+        bounds = [(0.0, 0.0) if a in self.excluded else (0.0, 1.0) for a in self.assets]
+        allowed = np.array([a not in self.excluded for a in self.assets])
+        start = allowed / allowed.sum()
+        budget = {"type": "eq", "fun": lambda w: np.sum(w) - 1}
+
+        def variance(w):
+            return w @ self.covariance @ w
+
+        def variance_grad(w):
+            return 2 * self.covariance @ w
+
+        # Global minimum variance portfolio anchors the efficient branch
+        gmv = minimize(variance, start, jac=variance_grad, bounds=bounds,
+                       constraints=[budget], method="SLSQP").x
+        low, high = gmv @ self.means, self.means[allowed].max()
+
+        returns, volatilities, weights = [], [], []
+        w0 = gmv
+        for target in np.linspace(low, high, self.num_points):
+            target_constraint = {"type": "eq", "fun": lambda w, t=target: w @ self.means - t}
+            result = minimize(variance, w0, jac=variance_grad, bounds=bounds,
+                              constraints=[budget, target_constraint], method="SLSQP")
+            w = np.clip(result.x, 0, None)
+            w /= w.sum()
+            w0 = w
+            returns.append(w @ self.means)
+            volatilities.append(np.sqrt(variance(w)))
+            weights.append(w)
+
+        returns = np.array(returns)
+        volatilities = np.maximum.accumulate(np.array(volatilities))
+        return returns, volatilities, np.array(weights).reshape(-1, n)
+
+    def _interpolate(self, grid, targets):
+        targets = np.clip(np.asarray(targets, dtype=float), grid[0], grid[-1])
+        upper = np.clip(np.searchsorted(grid, targets), 1, len(grid) - 1)
+        lower = upper - 1
+        span = grid[upper] - grid[lower]
+        frac = np.divide(targets - grid[lower], span, out=np.zeros_like(targets), where=span > 0)
+        return (1 - frac)[..., None] * self.weights[lower] + frac[..., None] * self.weights[upper]
+
+    def weights_for_return(self, target_return):
+        """Frontier weights for one or many target returns (clamped to the frontier)"""
+        return self._interpolate(self.returns, target_return)
+
+    def weights_for_volatility(self, target_volatility):
+        """Frontier weights for one or many target volatilities (clamped to the frontier)"""
+        return self._interpolate(self.volatilities, target_volatility)
+
+    def volatility_for_return(self, target_return):
+        """Frontier volatility at a target return"""
+        return np.interp(target_return, self.returns, self.volatilities)
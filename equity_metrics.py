@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+
+def wide_matrix(histories, column):
+    """Align one column of many per-ticker histories into a dates x tickers frame"""
+    series = {
+        ticker: hist[column]
+        for ticker, hist in histories.items()
+        if hist is not None and not hist.empty and column in hist
+    }
+    if not series:
+        return pd.DataFrame()
+    return pd.DataFrame(series).sort_index().astype(float)
+
+
+def _masked_returns(prices):
+    """Daily returns of every column against its own previous observation (NaN where unobserved)"""
+    observed = ~np.isnan(prices)
+    previous = pd.DataFrame(prices).ffill().shift(1).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = prices / previous - 1
+    return np.where(observed & ~np.isnan(previous), returns, np.nan)
+
+
+def cross_sectional_metrics(prices, volumes, market, risk_free_rate, market_risk_premium, tax_rate,
+                            inflation_rate, min_days=252, min_returns=100, min_overlap=50):
+    """Per-ticker CAGR, volatility, Sharpe, beta, CAPM and real return for all columns at once
+
+    prices and volumes are dates x tickers frames (NaN where a ticker has no
+    bar); market is the index price series. Each ticker is measured over its
+    own observed dates, and beta uses only the dates where both the ticker
+    and the index have a return. Tickers with fewer than min_days bars,
+    min_returns returns or min_overlap overlapping returns are dropped.
+    """
+    market = market.reindex(prices.index.union(market.index)).sort_index()
+    prices = prices.reindex(market.index)
+    values = prices.to_numpy(dtype=float)
+    observed = ~np.isnan(values)
+    counts = observed.sum(axis=0)
+    dates = market.index.to_numpy()
+
+    # CAGR from each column's first and last observed price
+    first = observed.argmax(axis=0)
+    last = len(values) - 1 - observed[::-1].argmax(axis=0)
+    columns = np.arange(values.shape[1])
+    start_price, end_price = values[first, columns], values[last, columns]
+    years = (dates[last] - dates[first]).astype('timedelta64[D]').astype(float) / 365.25
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = (end_price / start_price) ** (1.0 / years) - 1
+
+    # Annualized volatility of daily returns
+    returns = _masked_returns(values)
+    has_return = ~np.isnan(returns)
+    return_counts = has_return.sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(252)
+        sharpe_ratio = np.where(volatility != 0, (cagr - risk_free_rate) / volatility, np.nan)
+
+    # Beta: one masked covariance of every column against the index
+    market_returns = _masked_returns(market.to_numpy(dtype=float)[:, None])
+    overlap = has_return & ~np.isnan(market_returns)
+    n = overlap.sum(axis=0)
+    stock = np.where(overlap, returns, 0.0)
+    index = np.where(overlap, market_returns, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stock_dev = np.where(overlap, stock - stock.sum(axis=0) / n, 0.0)
+        index_dev = np.where(overlap, index - index.sum(axis=0) / n, 0.0)
+        covariance = (stock_dev * index_dev).sum(axis=0) / (n - 1)
+        market_variance = (index_dev ** 2).sum(axis=0) / (n - 1)
+        beta = np.where(market_variance != 0, covariance / market_variance, np.nan)
+    capm_return = np.where(np.isnan(beta), np.nan, risk_free_rate + beta * market_risk_premium)
+
+    real_return = cagr * (1 - tax_rate) - inflation_rate
+    volume_values = volumes.reindex(index=market.index, columns=prices.columns).to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        liquidity = np.nanmean(volume_values, axis=0) if volume_values.size else np.full(len(columns), np.nan)
+    risk_level = np.select([volatility < 0.20, volatility < 0.30], ['Low', 'Medium'], 'High')
+
+    metrics = pd.DataFrame({
+        'CAGR': cagr,
+        'Volatility': volatility,
+        'Sharpe_Ratio': sharpe_ratio,
+        'Beta': beta,
+        'CAPM_Expected_Return': capm_return,
+        'Real_Return': real_return,
+        'Liquidity': liquidity,
+        'Risk_Level': risk_level
+    }, index=prices.columns)
+    keep = (counts >= min_days) & (return_counts >= min_returns) & (n >= min_overlap)
+    return metrics[keep]
+
+
+def group_metrics(metrics, groups, numeric_columns, mode_column):
+    """Mean of numeric columns and mode of mode_column per group, via categorical codes
+
+    groups maps output column names to key arrays aligned with the metrics
+    rows. Rows come out ordered like a sorted groupby; NaNs are skipped in
+    means, and mode ties go to the smallest label.
+    """
+    categoricals = {name: pd.Categorical(keys) for name, keys in groups.items()}
+    sizes = [len(c.categories) for c in categoricals.values()]
+    codes = np.ravel_multi_index([c.codes for c in categoricals.values()], sizes)
+    present, group_codes = np.unique(codes, return_inverse=True)
+    num_groups = len(present)
+
+    result = {
+        name: categorical.categories[level_codes]
+        for (name, categorical), level_codes in zip(categoricals.items(), np.unravel_index(present, sizes))
+    }
+    for column in numeric_columns:
+        values = metrics[column].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        sums = np.bincount(group_codes[valid], weights=values[valid], minlength=num_groups)
+        counts = np.bincount(group_codes[valid], minlength=num_groups)
+        with np.errstate(invalid='ignore'):
+            result[column] = sums / counts
+
+    labels = pd.Categorical(metrics[mode_column])
+    tallies = np.zeros((num_groups, len(labels.categories)), dtype=np.int64)
+    np.add.at(tallies, (group_codes, labels.codes), 1)
+    result[mode_column] = labels.categories[tallies.argmax(axis=1)]
+    return pd.DataFrame(result)
@@ -4,15 +4,78 @@ from scipy.stats import norm
 import yfinance as yf
 from datetime import datetime, timedelta
 import json
+import os
+from asset_universe import AssetUniverse
+from price_downloader import PriceDownloader
+from price_store import PriceStore
+from equity_metrics import wide_matrix, cross_sectional_metrics, group_metrics
+from result_cache import StaleWhileRevalidateCache, canonical_hash
 
 class InvestmentGuide:
-    def __init__(self):
+    def __init__(self, offline=None, price_cache_dir=None):
         # Parameters (2025, India)
         self.risk_free_rate = 6.25 / 100  # 10-Year G-Sec yield
         self.inflation_rate = 5.5 / 100  # CPI projection
         self.tax_rate = 0.125  # Long-term capital gains tax
         self.market_risk_premium = 7.5 / 100  # NIFTY 50 premium
         
+        # Price download settings for equity analysis
+        self.market_ticker = '^NSEI'
+        self.download_workers = int(os.environ.get('EQUITY_DOWNLOAD_WORKERS', 8))
+        self.download_timeout = float(os.environ.get('EQUITY_DOWNLOAD_TIMEOUT', 15))
+        self.download_retries = int(os.environ.get('EQUITY_DOWNLOAD_RETRIES', 2))
+        self.analysis_deadline = float(os.environ.get('EQUITY_ANALYSIS_DEADLINE', 60))
+        # Shortest deadline a caller may ask for; longer requests are capped at analysis_deadline
+        self.min_analysis_deadline = float(os.environ.get('EQUITY_MIN_ANALYSIS_DEADLINE', 10))
+        
+        # Incremental on-disk price cache; offline mode only reads what is on disk
+        if offline is None:
+            offline = os.environ.get('EQUITY_OFFLINE', '0') == '1'
+        self.price_cache_dir = price_cache_dir or os.environ.get(
+            'EQUITY_PRICE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_cache')
+        )
+        self.price_store = PriceStore(self.price_cache_dir, self.fetch_history, offline)
+        self.downloader = PriceDownloader(
+            self.price_store.history, self.download_workers, self.download_timeout, self.download_retries
+        )
+        self.last_download_report = None
+        
+        # Equity results change at most once per trading day: serve them stale-while-revalidate
+        self.equity_cache = StaleWhileRevalidateCache(float(os.environ.get('EQUITY_CACHE_TTL', 900)))
+        
+        # Sectors and representative stocks for equity analysis
+        self.equity_sectors = {
+            'IT': {
+                'Large': ['TCS.NS', 'INFY.NS', 'HCLTECH.NS', 'WIPRO.NS', 'TECHM.NS'],
+                'Mid': ['TATAELXSI.NS', 'KPITTECH.NS', 'CYIENT.NS', 'SONATSOFTW.NS'],
+                'Small': ['QUICKHEAL.NS', 'SAKSOFT.NS', 'XCHANGING.NS', 'RSSOFTWARE.NS']
+            },
+            'Banking': {
+                'Large': ['HDFCBANK.NS', 'ICICIBANK.NS', 'SBIN.NS', 'KOTAKBANK.NS', 'AXISBANK.NS'],
+                'Mid': ['FEDERALBNK.NS', 'RBLBANK.NS', 'IDFCFIRSTB.NS', 'BANDHANBNK.NS'],
+                'Small': ['SURYODAY.NS', 'EQUITASBNK.NS', 'CSBBANK.NS', 'UTKARSHBNK.NS']
+            },
+            'Pharma': {
+                'Large': ['SUNPHARMA.NS', 'DIVISLAB.NS', 'CIPLA.NS', 'DRREDDY.NS', 'ZYDUSLIFE.NS'],
+                'Mid': ['GLENMARK.NS', 'IPCALAB.NS', 'NATCOPHARM.NS', 'AJANTPHARM.NS'],
+                'Small': ['LINCOLN.NS', 'KOPRAN.NS', 'WANBURY.NS', 'BALPHARMA.NS']
+            },
+            'Auto': {
+                'Large': ['MARUTI.NS', 'TATAMOTORS.NS', 'M&M.NS', 'BAJAJ-AUTO.NS', 'EICHERMOT.NS'],
+                'Mid': ['SONACOMS.NS', 'ENDURANCE.NS', 'MINDACORP.NS', 'SUNDRMFAST.NS'],
+                'Small': ['FIEMIND.NS', 'SSWL.NS', 'AUTOIND.NS', 'MUNJALSHOW.NS']
+            },
+            'Energy': {
+                'Large': ['RELIANCE.NS', 'ONGC.NS', 'NTPC.NS', 'POWERGRID.NS', 'BPCL.NS'],
+                'Mid': ['TATAPOWER.NS', 'JSWENERGY.NS', 'TORNTPOWER.NS', 'CESC.NS'],
+                'Small': ['GIPCL.NS', 'BFUTILITIE.NS', 'JPPOWER.NS', 'RPOWER.NS']
+            }
+        }
+    
+    def fetch_history(self, ticker, start_date, end_date, timeout=None):
+        """Download daily bars for one ticker from Yahoo Finance"""
+        return yf.Ticker(ticker).history(start=start_date, end=end_date, timeout=timeout, raise_errors=True)
+        
     def analyze_fixed_deposits(self):
         """Analyze Fixed Deposits with inflation and tax adjustments"""
         data = {
@@ -99,147 +162,86 @@ class InvestmentGuide:
         
         return pd.DataFrame(results)
     
-    def analyze_equity(self, start_date=None, end_date=None):
+    def analyze_equity(self, start_date=None, end_date=None, deadline=None):
         """Analyze equity markets across sectors and market caps"""
+        # Tickers not fetched within deadline seconds are left out; see last_download_report
+        results, self.last_download_report = self._analyze_equity(start_date, end_date, deadline)
+        return results
+    
+    def equity_data_version(self, end_date=None):
+        """Last trading day covered by an analysis ending at end_date (exclusive, default today)"""
+        end = pd.Timestamp(end_date) if end_date else pd.Timestamp(datetime.today().date())
+        return (end - pd.offsets.BDay(1)).strftime('%Y-%m-%d')
+    
+    def analyze_equity_cached(self, start_date=None, end_date=None, deadline=None):
+        """Cached equity analysis as (results, download_report, cache_info); results must not be modified"""
+        # Client deadlines are clamped to [min_analysis_deadline, analysis_deadline]
+        if deadline:
+            deadline = min(max(float(deadline), self.min_analysis_deadline), self.analysis_deadline)
+        
+        def compute():
+            results, report = self._analyze_equity(start_date, end_date, deadline)
+            if results.empty:
+                raise ValueError(f"Equity analysis produced no results (download: {report})")
+            return results, report
+        
+        # Fresh for EQUITY_CACHE_TTL within one trading day; results cut short by the
+        # deadline are stored stale so the next request refreshes them
+        key = canonical_hash('equity', self.market_ticker, self.equity_sectors, start_date, end_date)
+        (results, report), cache_info = self.equity_cache.get(
+            key, self.equity_data_version(end_date), compute, lambda value: not value[1]['timed_out']
+        )
+        return results, report, cache_info
+    
+    def _analyze_equity(self, start_date, end_date, deadline):
+        """Equity analysis and its download report"""
         if start_date is None:
             start_date = (datetime.today() - timedelta(days=5*365)).strftime('%Y-%m-%d')
         if end_date is None:
             end_date = datetime.today().strftime('%Y-%m-%d')
             
-        # Define sectors and representative stocks
-        sectors = {
-            'IT': {
-                'Large': ['TCS.NS', 'INFY.NS', 'HCLTECH.NS', 'WIPRO.NS', 'TECHM.NS'],
-                'Mid': ['TATAELXSI.NS', 'KPITTECH.NS', 'CYIENT.NS', 'SONATSOFTW.NS'],
-                'Small': ['QUICKHEAL.NS', 'SAKSOFT.NS', 'XCHANGING.NS', 'RSSOFTWARE.NS']
-            },
-            'Banking': {
-                'Large': ['HDFCBANK.NS', 'ICICIBANK.NS', 'SBIN.NS', 'KOTAKBANK.NS', 'AXISBANK.NS'],
-                'Mid': ['FEDERALBNK.NS', 'RBLBANK.NS', 'IDFCFIRSTB.NS', 'BANDHANBNK.NS'],
-                'Small': ['SURYODAY.NS', 'EQUITASBNK.NS', 'CSBBANK.NS', 'UTKARSHBNK.NS']
-            },
-            'Pharma': {
-                'Large': ['SUNPHARMA.NS', 'DIVISLAB.NS', 'CIPLA.NS', 'DRREDDY.NS', 'ZYDUSLIFE.NS'],
-                'Mid': ['GLENMARK.NS', 'IPCALAB.NS', 'NATCOPHARM.NS', 'AJANTPHARM.NS'],
-                'Small': ['LINCOLN.NS', 'KOPRAN.NS', 'WANBURY.NS', 'BALPHARMA.NS']
-            },
-            'Auto': {
-                'Large': ['MARUTI.NS', 'TATAMOTORS.NS', 'M&M.NS', 'BAJAJ-AUTO.NS', 'EICHERMOT.NS'],
-                'Mid': ['SONACOMS.NS', 'ENDURANCE.NS', 'MINDACORP.NS', 'SUNDRMFAST.NS'],
-                'Small': ['FIEMIND.NS', 'SSWL.NS', 'AUTOIND.NS', 'MUNJALSHOW.NS']
-            },
-            'Energy': {
-                'Large': ['RELIANCE.NS', 'ONGC.NS', 'NTPC.NS', 'POWERGRID.NS', 'BPCL.NS'],
-                'Mid': ['TATAPOWER.NS', 'JSWENERGY.NS', 'TORNTPOWER.NS', 'CESC.NS'],
-                'Small': ['GIPCL.NS', 'BFUTILITIE.NS', 'JPPOWER.NS', 'RPOWER.NS']
-            }
-        }
+        sectors = self.equity_sectors
+        tickers = [ticker for caps in sectors.values() for names in caps.values() for ticker in names]
         
-        # Fetch market data for beta calculation
-        market_ticker = '^NSEI'
+        # Fetch the market series together with all stocks, concurrently and within the deadline
+        market_ticker = self.market_ticker
+        histories, report = self.downloader.download(
+            [market_ticker] + tickers, start_date, end_date, deadline or self.analysis_deadline
+        )
         try:
-            market_data = yf.Ticker(market_ticker).history(start=start_date, end=end_date)
-            if market_data.empty or len(market_data) < 252:
+            market_data = histories.get(market_ticker)
+            if market_data is None or market_data.empty or len(market_data) < 252:
                 raise ValueError("Insufficient market data for NIFTY 50")
-            market_daily_returns = market_data['Close'].pct_change().dropna()
-            market_daily_returns.index = market_daily_returns.index.tz_localize(None)
         except Exception as e:
             print(f"Error fetching market data: {e}")
-            return pd.DataFrame()
-        
-        def analyze_stock(ticker):
-            try:
-                stock = yf.Ticker(ticker)
-                hist = stock.history(start=start_date, end=end_date)
-                
-                if hist.empty or len(hist) < 252:
-                    return None
-                
-                hist.index = hist.index.tz_localize(None)
-                
-                # CAGR
-                start_price = hist['Close'].iloc[0]
-                end_price = hist['Close'].iloc[-1]
-                years = (hist.index[-1] - hist.index[0]).days / 365.25
-                cagr = (end_price / start_price) ** (1.0 / years) - 1
-                
-                # Daily returns
-                daily_returns = hist['Close'].pct_change().dropna()
-                if len(daily_returns) < 100:
-                    return None
-                
-                # Volatility (annualized)
-                volatility = daily_returns.std() * np.sqrt(252)
-                
-                # Sharpe Ratio (annualized)
-                excess_return = cagr - self.risk_free_rate
-                sharpe_ratio = excess_return / volatility if volatility != 0 else np.nan
-                
-                # Beta (relative to NIFTY 50)
-                aligned_returns = pd.concat([daily_returns, market_daily_returns], axis=1).dropna()
-                if len(aligned_returns) < 50:
-                    return None
-                stock_returns = aligned_returns.iloc[:, 0]
-                market_returns = aligned_returns.iloc[:, 1]
-                cov = stock_returns.cov(market_returns)
-                market_var = market_returns.var()
-                beta = cov / market_var if market_var != 0 else np.nan
-                
-                # CAPM Expected Return
-                capm_return = self.risk_free_rate + beta * self.market_risk_premium if not np.isnan(beta) else np.nan
-                
-                # Real Return (post-tax, inflation-adjusted)
-                post_tax_return = cagr * (1 - self.tax_rate)
-                real_return = post_tax_return - self.inflation_rate
-                
-                # Liquidity (average daily volume)
-                avg_volume = hist['Volume'].mean()
-                
-                # Risk Level
-                risk_level = 'Low' if volatility < 0.20 else 'Medium' if volatility < 0.30 else 'High'
-                
-                return {
-                    'CAGR': cagr,
-                    'Volatility': volatility,
-                    'Sharpe_Ratio': sharpe_ratio,
-                    'Beta': beta,
-                    'CAPM_Expected_Return': capm_return,
-                    'Real_Return': real_return,
-                    'Liquidity': avg_volume,
-                    'Risk_Level': risk_level
-                }
-            except Exception as e:
-                return None
-        
-        # Analyze all stocks
-        results = []
-        for sector, caps in sectors.items():
-            for cap, tickers in caps.items():
-                for ticker in tickers:
-                    result = analyze_stock(ticker)
-                    if result:
-                        results.append({
-                            'Sector': sector,
-                            'Cap': cap,
-                            'Ticker': ticker,
-                            **result
-                        })
+            return pd.DataFrame(), report
         
-        if not results:
-            return pd.DataFrame()
+        # Metrics for all stocks at once on an aligned dates x tickers matrix
+        stock_histories = {ticker: histories.get(ticker) for ticker in tickers}
+        prices = wide_matrix(stock_histories, 'Close')
+        if prices.empty:
+            return pd.DataFrame(), report
+        metrics = cross_sectional_metrics(
+            prices, wide_matrix(stock_histories, 'Volume'), market_data['Close'].dropna(),
+            self.risk_free_rate, self.market_risk_premium, self.tax_rate, self.inflation_rate
+        )
+        if metrics.empty:
+            return pd.DataFrame(), report
         
-        # Create DataFrame and aggregate
-        df = pd.DataFrame(results)
-        agg_df = df.groupby(['Sector', 'Cap']).agg({
-            'CAGR': 'mean',
-            'Volatility': 'mean',
-            'Sharpe_Ratio': 'mean',
-            'Beta': 'mean',
-            'CAPM_Expected_Return': 'mean',
-            'Real_Return': 'mean',
-            'Liquidity': 'mean',
-            'Risk_Level': lambda x: x.mode()[0] if not x.empty else 'Unknown'
-        }).reset_index()
+        # Aggregate by sector and market cap
+        ticker_groups = {
+            ticker: (sector, cap)
+            for sector, caps in sectors.items() for cap, names in caps.items() for ticker in names
+        }
+        agg_df = group_metrics(
+            metrics,
+            {
+                'Sector': [ticker_groups[t][0] for t in metrics.index],
+                'Cap': [ticker_groups[t][1] for t in metrics.index]
+            },
+            ['CAGR', 'Volatility', 'Sharpe_Ratio', 'Beta', 'CAPM_Expected_Return', 'Real_Return', 'Liquidity'],
+            'Risk_Level'
+        )
         
         # Normalize Liquidity Level (0-1 scale)
         agg_df['Liquidity_Level'] = (agg_df['Liquidity'] - agg_df['Liquidity'].min()) / (agg_df['Liquidity'].max() - agg_df['Liquidity'].min())
@@ -257,7 +259,7 @@ class InvestmentGuide:
             'CAPM_Expected_Return (%)', 'Real_Return (%)', 'Risk_Level', 'Liquidity_Level'
         ]
         
-        return agg_df
+        return agg_df, report
     
     def get_investment_recommendations(self, user_profile):
         """Get personalized investment recommendations based on user profile"""
@@ -287,21 +289,15 @@ class InvestmentGuide:
     
     def calculate_portfolio_metrics(self, weights, investment_data):
         """Calculate portfolio-level metrics"""
-        portfolio_cagr = 0
-        portfolio_volatility = 0
-        portfolio_beta = 0
-        
-        for asset, weight in weights.items():
-            if weight > 0 and asset in investment_data:
-                asset_data = investment_data[asset]
-                portfolio_cagr += weight * asset_data.get('cagr', 0)
-                portfolio_volatility += weight * asset_data.get('volatility', 0)
-                portfolio_beta += weight * asset_data.get('beta', 0)
+        # investment_data: AssetUniverse or {asset: {"cagr", "volatility", "beta"}}; weights: dict, vector or matrix
+        universe = investment_data if isinstance(investment_data, AssetUniverse) else AssetUniverse.from_dicts(investment_data)
+        weight_vector = np.clip(universe.weights_vector(weights), 0, None)
+        metrics = universe.portfolio_metrics(weight_vector)
         
         return {
-            'portfolio_cagr': portfolio_cagr,
-            'portfolio_volatility': portfolio_volatility,
-            'portfolio_beta': portfolio_beta
+            'portfolio_cagr': metrics['cagr'],
+            'portfolio_volatility': metrics['volatility'],
+            'portfolio_beta': metrics['beta']
         }
 
 # Example usage
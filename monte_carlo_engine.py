@@ -0,0 +1,527 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from scipy.stats import norm, qmc
+from streaming_stats import PathSummary, StreamingSummary, max_drawdowns
+
+
+def _simulate_shard(engine, amount, cagr, volatility, years, num_paths, seed_seq, collect, goal):
+    """Simulate one shard with its own random stream (module level so it pickles)"""
+    rng = np.random.default_rng(seed_seq)
+    if collect == "summary":
+        return engine.stream_final_values(amount, cagr, volatility, years, StreamingSummary(), num_paths, rng)
+    if collect == "risk_values":
+        final_values, drawdowns = [], []
+        for paths in engine.iter_path_values(amount, cagr, volatility, years, num_paths, rng):
+            final_values.append(paths[:, -1])
+            drawdowns.append(max_drawdowns(paths, amount))
+        return np.concatenate(final_values), np.concatenate(drawdowns)
+    if collect == "risk_summary":
+        summary, drawdowns = StreamingSummary(), StreamingSummary()
+        for paths in engine.iter_path_values(amount, cagr, volatility, years, num_paths, rng):
+            summary.update(paths[:, -1])
+            drawdowns.update(max_drawdowns(paths, amount))
+        return summary, drawdowns
+    if collect == "path_summary":
+        summary = PathSummary(years, goal, amount)
+        for paths in engine.iter_path_values(amount, cagr, volatility, years, num_paths, rng):
+            summary.update(paths)
+        return summary
+    if collect == "paths":
+        return np.concatenate(list(engine.iter_path_values(amount, cagr, volatility, years, num_paths, rng)))
+    if collect == "annuity_values":
+        final_values, annuity_values = [], []
+        for paths in engine.iter_path_values(amount, cagr, volatility, years, num_paths, rng):
+            # Growth of the start-of-year value of every year to the horizon
+            previous = np.hstack([np.full((len(paths), 1), amount), paths[:, :-1]])
+            final_values.append(paths[:, -1])
+            annuity_values.append((paths[:, -1:] / previous).sum(axis=1))
+        return np.concatenate(final_values), np.concatenate(annuity_values)
+    if collect == "goal_hits":
+        goal_hits = np.zeros(years, dtype=np.int64)
+        for paths in engine.iter_path_values(amount, cagr, volatility, years, num_paths, rng):
+            goal_hits += np.count_nonzero(paths >= goal, axis=0)
+        return goal_hits
+    return engine.simulate_final_values(amount, cagr, volatility, years, num_paths, rng)
+
+
+def _simulate_batch(engine, amount, cagr, volatility, years, num_paths, seed_seq, method):
+    """Terminal values, control variates and maximum drawdowns of one adaptive batch"""
+    rng = np.random.default_rng(seed_seq)
+    annual_returns = cagr + volatility * engine.draw_normals(num_paths, years, rng, method)
+    controls = amount * np.prod(1 + annual_returns, axis=1)
+    np.maximum(annual_returns, engine.min_annual_return, out=annual_returns)
+    path_values = amount * np.cumprod(1 + annual_returns, axis=1)
+    return path_values[:, -1], controls, max_drawdowns(path_values, amount)
+
+
+class MonteCarloEngine:
+    """Vectorized Monte Carlo engine for lump-sum portfolio projections"""
+
+    def __init__(self, num_simulations=10000, memory_limit_mb=64, workers=1, executor="thread"):
+        self.num_simulations = num_simulations
+        # Paths per independently seeded shard; fixed so results do not depend on workers
+        self.shard_size = 65536
+        self.workers = workers
+        self.executor = executor
+        # Upper bound on the size of a single (paths x years) return matrix
+        self.memory_limit_mb = memory_limit_mb
+        self.min_annual_return = -0.99
+        # Adaptive runs add paths in batches (a power of two keeps Sobol balanced)
+        self.batch_size = 1024
+        self.min_batches = 4
+        # Batches simulated between checks of the stopping rule
+        self.check_every = 8
+        self.confidence_z = 1.96
+
+    def chunk_size(self, steps):
+        """Number of paths that fit in one chunk under the memory cap"""
+        bytes_per_path = max(1, steps) * np.dtype(np.float64).itemsize
+        limit_bytes = self.memory_limit_mb * 1024 * 1024
+        return int(max(1, limit_bytes // bytes_per_path))
+
+    def iter_chunks(self, num_paths, steps):
+        """Yield path counts for successive chunks covering num_paths"""
+        size = self.chunk_size(steps)
+        remaining = num_paths
+        while remaining > 0:
+            n = min(size, remaining)
+            yield n
+            remaining -= n
+
+    def iter_final_values(self, amount, cagr, volatility, years, num_paths, rng):
+        """Yield terminal values chunk by chunk for i.i.d. normal annual returns"""
+        # Draws are consumed sequentially, so the result does not depend on chunking
+        for n in self.iter_chunks(num_paths, years):
+            annual_returns = rng.normal(loc=cagr, scale=volatility, size=(n, years))
+            np.maximum(annual_returns, self.min_annual_return, out=annual_returns)
+            annual_returns += 1
+            yield amount * np.prod(annual_returns, axis=1)
+
+    def iter_path_values(self, amount, cagr, volatility, years, num_paths, rng):
+        """Yield (paths, years) matrices of year-end portfolio values chunk by chunk
+
+        Uses the same draws as iter_final_values, so the last column equals
+        the terminal values simulated from the same random stream.
+        """
+        for n in self.iter_chunks(num_paths, years):
+            annual_returns = rng.normal(loc=cagr, scale=volatility, size=(n, years))
+            np.maximum(annual_returns, self.min_annual_return, out=annual_returns)
+            annual_returns += 1
+            yield amount * np.cumprod(annual_returns, axis=1)
+
+    def simulate_final_values(self, amount, cagr, volatility, years, num_paths=None, rng=None):
+        """Simulate terminal portfolio values for i.i.d. normal annual returns"""
+        num_paths = self.num_simulations if num_paths is None else int(num_paths)
+        rng = rng if rng is not None else np.random.default_rng()
+
+        final_values = np.empty(num_paths)
+        start = 0
+        for chunk in self.iter_final_values(amount, cagr, volatility, years, num_paths, rng):
+            final_values[start:start + len(chunk)] = chunk
+            start += len(chunk)
+
+        return final_values
+
+    def stream_final_values(self, amount, cagr, volatility, years, summary, num_paths=None, rng=None):
+        """Feed simulated terminal values into a streaming summary without storing them"""
+        num_paths = self.num_simulations if num_paths is None else int(num_paths)
+        rng = rng if rng is not None else np.random.default_rng()
+
+        for chunk in self.iter_final_values(amount, cagr, volatility, years, num_paths, rng):
+            summary.update(chunk)
+
+        return summary
+
+    def draw_normals(self, num_paths, years, rng, method="standard"):
+        """Draw a (paths, years) matrix of standard normals using the given sampling method"""
+        if method == "antithetic":
+            half = rng.standard_normal(size=((num_paths + 1) // 2, years))
+            # Pair each path with its mirror image; pairs stay adjacent
+            return np.stack([half, -half], axis=1).reshape(-1, years)[:num_paths]
+        if method == "sobol":
+            # Fresh scramble per call so batches are independent replicates
+            sobol = qmc.Sobol(years, scramble=True, seed=rng)
+            m = int(np.ceil(np.log2(max(num_paths, 1))))
+            uniforms = sobol.random_base2(m)[:num_paths]
+            return norm.ppf(np.clip(uniforms, 1e-12, 1 - 1e-12))
+        if method != "standard":
+            raise ValueError(f"Unknown sampling method: {method}")
+        return rng.standard_normal(size=(num_paths, years))
+
+    def adaptive_final_values(self, amount, cagr, volatility, years, method="standard", control_mean=None,
+                              tolerance=None, max_paths=None, seed=None, workers=None, store_values=True):
+        """Simulate in batches until the 95% confidence intervals are within tolerance
+
+        The mean, 5th and 95th percentile are checked against a relative
+        tolerance, with standard errors estimated from independent batch
+        replicates so antithetic pairs and scrambled Sobol batches are
+        handled correctly. When control_mean is given (the closed-form projection
+        amount * (1 + cagr) ** years), the unclipped terminal value, whose
+        expectation it is, serves as a control variate for the mean.
+
+        Every batch has its own SeedSequence child stream and the stopping
+        rule is checked after each round of check_every batches, so a seed
+        gives the same result for any number of workers. Only per-batch
+        statistics are kept between checks; pooled percentiles are computed
+        once at the end from the stored terminal values and drawdowns
+        ("final_values", "drawdowns") or, without store_values, from
+        streaming summaries ("summary", "drawdown_summary").
+        """
+        max_paths = self.num_simulations if max_paths is None else int(max_paths)
+        workers = self.workers if workers is None else max(1, int(workers))
+        sizes = [min(self.batch_size, max_paths - start) for start in range(0, max_paths, self.batch_size)]
+        seed_seqs = np.random.SeedSequence(seed).spawn(len(sizes))
+
+        # Per batch: size, mean value, mean control, p5, p95, centred co-moments with the control
+        batches = np.zeros((len(sizes), 7))
+        if store_values:
+            final_values, drawdowns = np.empty(max_paths), np.empty(max_paths)
+        else:
+            summary, drawdown_summary = StreamingSummary(), StreamingSummary()
+
+        pool = None
+        if workers > 1 and len(sizes) > 1:
+            pool_class = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+            pool = pool_class(max_workers=min(workers, self.check_every, os.cpu_count() or 1))
+        try:
+            done = num_paths = 0
+            stats = {}
+            while done < len(sizes):
+                batch_range = range(done, min(done + self.check_every, len(sizes)))
+                tasks = [(self, amount, cagr, volatility, years, sizes[i], seed_seqs[i], method) for i in batch_range]
+                results = pool.map(_simulate_batch, *zip(*tasks)) if pool else [_simulate_batch(*t) for t in tasks]
+                for i, (values, controls, batch_drawdowns) in zip(batch_range, results):
+                    n = len(values)
+                    value_dev, control_dev = values - values.mean(), controls - controls.mean()
+                    batches[i] = (n, values.mean(), controls.mean(), *np.percentile(values, [5, 95]),
+                                  value_dev @ control_dev, control_dev @ control_dev)
+                    if store_values:
+                        final_values[num_paths:num_paths + n] = values
+                        drawdowns[num_paths:num_paths + n] = batch_drawdowns
+                    else:
+                        summary.update(values)
+                        drawdown_summary.update(batch_drawdowns)
+                    num_paths += n
+                done = batch_range.stop
+
+                stats = self._adaptive_estimates(batches[:done], control_mean)
+                if tolerance is not None and done >= self.min_batches:
+                    if max(stats["mean_rel_error"], stats["percentile_5_rel_error"],
+                           stats["percentile_95_rel_error"]) <= tolerance:
+                        break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        stats["num_simulations"] = num_paths
+        if store_values:
+            stats["final_values"], stats["drawdowns"] = final_values[:num_paths], drawdowns[:num_paths]
+            stats["percentile_5"], stats["percentile_95"] = np.percentile(stats["final_values"], [5, 95])
+        else:
+            stats["summary"], stats["drawdown_summary"] = summary, drawdown_summary
+            stats["percentile_5"], stats["percentile_95"] = summary.percentile(5), summary.percentile(95)
+        return stats
+
+    def _adaptive_estimates(self, batches, control_mean):
+        """Point estimates and relative CI half-widths from per-batch statistics"""
+        sizes, value_means, control_means, p5, p95, co_moment, control_moment = batches.T
+        beta = 0.0
+        if control_mean is not None:
+            # Pooled regression coefficient of value on control, merged from batch moments
+            value_dev = value_means - np.average(value_means, weights=sizes)
+            control_dev = control_means - np.average(control_means, weights=sizes)
+            control_var = control_moment.sum() + sizes @ control_dev ** 2
+            if control_var > 0:
+                beta = (co_moment.sum() + sizes @ (value_dev * control_dev)) / control_var
+
+        batch_means = value_means - beta * (control_means - control_mean) if beta else value_means
+        mean_value = np.average(batch_means, weights=sizes)
+
+        stats = {
+            "mean_value": mean_value,
+            "mean_rel_error": self._relative_half_width(batch_means, mean_value)
+        }
+        for p, batch_percentiles in ((5, p5), (95, p95)):
+            estimate = np.average(batch_percentiles, weights=sizes)
+            stats[f"percentile_{p}"] = estimate
+            stats[f"percentile_{p}_rel_error"] = self._relative_half_width(batch_percentiles, estimate)
+        return stats
+
+    def _relative_half_width(self, replicates, estimate):
+        """Relative confidence half-width from independent batch replicates"""
+        if len(replicates) < 2 or not estimate:
+            return np.inf
+        std_error = np.std(replicates, ddof=1) / np.sqrt(len(replicates))
+        return self.confidence_z * std_error / abs(estimate)
+
+    def shard_sizes(self, num_paths):
+        """Split num_paths into fixed-size shards"""
+        full, rest = divmod(int(num_paths), self.shard_size)
+        return [self.shard_size] * full + ([rest] if rest else [])
+
+    def parallel_final_values(self, amount, cagr, volatility, years, num_paths=None, seed=None,
+                              workers=None, collect="values", goal=None):
+        """Simulate across a worker pool with one SeedSequence child stream per shard
+
+        Shards have a fixed size and are merged in shard order, so a given
+        seed gives bit-identical output for any number of workers. collect
+        selects the output: "values" (terminal value array), "risk_values"
+        (terminal values and per-path maximum drawdowns), "annuity_values"
+        (terminal values and the terminal value of one unit paid at the start
+        of every year), "paths" ((paths, years) value matrix), "summary"
+        (merged StreamingSummary of terminal values), "risk_summary" (merged
+        summaries of terminal values and drawdowns), "path_summary" (merged
+        per-year PathSummary) or "goal_hits" (per-year count of paths at or
+        above goal). Every mode except "paths" works chunk by chunk.
+        """
+        num_paths = self.num_simulations if num_paths is None else int(num_paths)
+        workers = self.workers if workers is None else max(1, int(workers))
+        sizes = self.shard_sizes(num_paths)
+        seed_seqs = np.random.SeedSequence(seed).spawn(len(sizes))
+        tasks = [(self, amount, cagr, volatility, years, n, ss, collect, goal) for n, ss in zip(sizes, seed_seqs)]
+
+        if workers == 1 or len(tasks) == 1:
+            results = [_simulate_shard(*task) for task in tasks]
+        else:
+            pool_class = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+            with pool_class(max_workers=min(workers, len(tasks), os.cpu_count() or 1)) as pool:
+                results = list(pool.map(_simulate_shard, *zip(*tasks)))
+
+        if collect in ("summary", "path_summary"):
+            summary = StreamingSummary() if collect == "summary" else PathSummary(years, goal, amount)
+            for shard_summary in results:
+                summary.merge(shard_summary)
+            return summary
+        if collect in ("risk_values", "annuity_values"):
+            return tuple(np.concatenate(parts) for parts in zip(*results))
+        if collect == "goal_hits":
+            return np.sum(results, axis=0, dtype=np.int64) if results else np.zeros(years, dtype=np.int64)
+        if collect == "risk_summary":
+            summary, drawdowns = StreamingSummary(), StreamingSummary()
+            for shard_summary, shard_drawdowns in results:
+                summary.merge(shard_summary)
+                drawdowns.merge(shard_drawdowns)
+            return summary, drawdowns
+        if not results:
+            return np.empty((0, years)) if collect == "paths" else np.empty(0)
+        return np.concatenate(results)
+
+    def simulate_profiles(self, amount, cagrs, volatilities, years, num_paths=None, rng=None):
+        """Terminal values (paths, profiles) for several (cagr, volatility) pairs on shared draws
+
+        Every profile is driven by the same standard normal matrix (common
+        random numbers), so differences between profiles carry no sampling noise.
+        """
+        num_paths = self.num_simulations if num_paths is None else int(num_paths)
+        rng = rng if rng is not None else np.random.default_rng()
+        cagrs = np.asarray(cagrs, dtype=float)
+        volatilities = np.asarray(volatilities, dtype=float)
+
+        final_values = np.empty((num_paths, len(cagrs)))
+        start = 0
+        for n in self.iter_chunks(num_paths, years * len(cagrs)):
+            normals = rng.standard_normal(size=(n, years, 1))
+            annual_returns = cagrs + volatilities * normals
+            np.maximum(annual_returns, self.min_annual_return, out=annual_returns)
+            annual_returns += 1
+            final_values[start:start + n] = amount * np.prod(annual_returns, axis=1)
+            start += n
+
+        return final_values
+
+    def simulate_monthly_final_values(self, amount, weights, annual_means, annual_covariance, years,
+                                      num_paths=None, rng=None, monthly_contribution=0.0, step_up=0.0,
+                                      rebalance="annual", threshold=0.05, path_summary=None):
+        """Monthly-step multi-asset simulation with SIP contributions and rebalancing
+
+        Contributions are invested at the target weights at the start of each
+        month and grow by step_up once a year. rebalance is "none", "monthly",
+        "quarterly", "annual" (calendar) or "threshold" (whenever any weight
+        drifts more than threshold from target at a month end). Calendar
+        schedules are vectorized over paths and over the months of each
+        rebalancing period; threshold rebalancing steps month by month,
+        vectorized over paths. Memory is bounded by chunking over paths.
+        Given a PathSummary, year-end portfolio values are folded into it
+        chunk by chunk.
+        """
+        num_paths = self.num_simulations if num_paths is None else int(num_paths)
+        rng = rng if rng is not None else np.random.default_rng()
+        months = int(round(years * 12))
+
+        weights = np.asarray(weights, dtype=float)
+        active = weights > 0
+        weights = weights[active] / weights[active].sum()
+        monthly_means = (1 + np.asarray(annual_means, dtype=float)[active]) ** (1 / 12) - 1
+        covariance = np.asarray(annual_covariance, dtype=float)[np.ix_(active, active)] / 12
+        cholesky = np.linalg.cholesky(covariance)
+        contributions = monthly_contribution * (1 + step_up) ** (np.arange(months) // 12)
+        periods = {"none": months, "monthly": 1, "quarterly": 3, "annual": 12}
+        if rebalance != "threshold" and rebalance not in periods:
+            raise ValueError(f"Unknown rebalancing schedule: {rebalance}")
+
+        final_values = np.empty(num_paths)
+        start = 0
+        for n in self.iter_chunks(num_paths, months * len(weights)):
+            year_values = np.empty((n, months // 12)) if path_summary is not None else None
+            normals = rng.standard_normal(size=(n, months, len(weights)))
+            growth = normals @ cholesky.T
+            growth += monthly_means
+            np.maximum(growth, self.min_annual_return, out=growth)
+            growth += 1
+
+            holdings = np.tile(amount * weights, (n, 1))
+            if rebalance == "threshold":
+                for month in range(months):
+                    holdings += contributions[month] * weights
+                    holdings *= growth[:, month]
+                    totals = holdings.sum(axis=1, keepdims=True)
+                    drifted = np.abs(holdings / totals - weights).max(axis=1) > threshold
+                    holdings[drifted] = totals[drifted] * weights
+                    if year_values is not None and (month + 1) % 12 == 0:
+                        year_values[:, month // 12] = totals[:, 0]
+            else:
+                period = max(1, periods[rebalance])
+                if year_values is not None:
+                    # Split buy-and-hold into years so every year end is observed
+                    period = min(period, 12)
+                for first in range(0, months, period):
+                    period_growth = np.cumprod(growth[:, first:first + period], axis=1)
+                    prior_growth = np.concatenate(
+                        [np.ones((n, 1, len(weights))), period_growth[:, :-1]], axis=1
+                    )
+                    # Each contribution compounds from its month to the period end
+                    invested = (contributions[first:first + period, None] / prior_growth).sum(axis=1)
+                    holdings = period_growth[:, -1] * (holdings + invested * weights)
+                    if rebalance != "none":
+                        holdings = holdings.sum(axis=1, keepdims=True) * weights
+                    if year_values is not None and (first + period) % 12 == 0:
+                        year_values[:, (first + period) // 12 - 1] = holdings.sum(axis=1)
+
+            final_values[start:start + n] = holdings.sum(axis=1)
+            if path_summary is not None:
+                path_summary.update(year_values)
+            start += n
+
+        return final_values
+
+    def bootstrap_indices(self, num_paths, years, history_length, rng, method="stationary", block_length=5):
+        """Row indices (paths, years) into a historical panel for a block bootstrap
+
+        "stationary" starts a new block each year with probability
+        1 / block_length (Politis-Romano); "moving" uses fixed-length blocks.
+        Blocks wrap around the end of the history. Fully vectorized: each
+        year's index is its block start plus the years elapsed since then.
+        """
+        steps = np.arange(years)
+        if method == "stationary":
+            new_block = rng.random(size=(num_paths, years)) < 1 / block_length
+            new_block[:, 0] = True
+        elif method == "moving":
+            new_block = np.broadcast_to(steps % block_length == 0, (num_paths, years))
+        else:
+            raise ValueError(f"Unknown bootstrap method: {method}")
+        block_starts = rng.integers(history_length, size=(num_paths, years))
+        last_start = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+        start_rows = np.take_along_axis(block_starts, last_start, axis=1)
+        return (start_rows + steps - last_start) % history_length
+
+    def simulate_bootstrap_final_values(self, amount, history, weight_matrix, years, num_paths=None, rng=None,
+                                        method="stationary", block_length=5, drawdowns=False, path_summaries=None):
+        """Terminal values (paths, portfolios) from block-bootstrapped historical asset returns
+
+        With drawdowns, also returns the (paths, portfolios) maximum drawdowns.
+        path_summaries (one PathSummary per portfolio) receive year-end values.
+        """
+        num_paths = self.num_simulations if num_paths is None else int(num_paths)
+        rng = rng if rng is not None else np.random.default_rng()
+        history = np.asarray(history, dtype=float)
+        weight_matrix = np.atleast_2d(weight_matrix)
+
+        final_values = np.empty((num_paths, weight_matrix.shape[0]))
+        path_drawdowns = np.empty_like(final_values) if drawdowns else None
+        start = 0
+        for n in self.iter_chunks(num_paths, years * history.shape[1]):
+            indices = self.bootstrap_indices(n, years, len(history), rng, method, block_length)
+            asset_returns = history[indices]
+            self._store_evaluation(asset_returns, amount, weight_matrix, final_values, path_drawdowns, start,
+                                   path_summaries)
+            start += n
+
+        return (final_values, path_drawdowns) if drawdowns else final_values
+
+    def simulate_asset_returns(self, means, cholesky, years, num_paths, rng):
+        """Draw correlated per-asset annual returns with shape (paths, years, assets)"""
+        normals = rng.standard_normal(size=(num_paths, years, len(means)))
+        asset_returns = normals @ cholesky.T
+        asset_returns += means
+        np.maximum(asset_returns, self.min_annual_return, out=asset_returns)
+        return asset_returns
+
+    def evaluate_weights(self, asset_returns, amount, weight_matrix, drawdowns=False, path_summaries=None):
+        """Terminal values (paths, portfolios) for annually rebalanced weight vectors
+
+        With drawdowns, returns (terminal values, maximum drawdowns), both (paths, portfolios).
+        path_summaries (one PathSummary per portfolio) receive the year-end values.
+        """
+        weight_matrix = np.atleast_2d(weight_matrix)
+        portfolio_returns = asset_returns @ weight_matrix.T
+        np.maximum(portfolio_returns, self.min_annual_return, out=portfolio_returns)
+        portfolio_returns += 1
+        if not drawdowns and path_summaries is None:
+            return amount * np.prod(portfolio_returns, axis=1)
+        path_values = amount * np.cumprod(portfolio_returns, axis=1)
+        for j, path_summary in enumerate(path_summaries or []):
+            path_summary.update(path_values[:, :, j])
+        if not drawdowns:
+            return path_values[:, -1]
+        num_paths, years, num_portfolios = path_values.shape
+        per_portfolio = np.moveaxis(path_values, 2, 1).reshape(-1, years)
+        return path_values[:, -1], max_drawdowns(per_portfolio, amount).reshape(num_paths, num_portfolios)
+
+    def _store_evaluation(self, asset_returns, amount, weight_matrix, final_values, path_drawdowns, start,
+                          path_summaries=None):
+        """Evaluate a chunk of asset returns into preallocated terminal value (and drawdown) arrays"""
+        n = len(asset_returns)
+        if path_drawdowns is None:
+            final_values[start:start + n] = self.evaluate_weights(
+                asset_returns, amount, weight_matrix, path_summaries=path_summaries
+            )
+        else:
+            final_values[start:start + n], path_drawdowns[start:start + n] = self.evaluate_weights(
+                asset_returns, amount, weight_matrix, drawdowns=True, path_summaries=path_summaries
+            )
+
+    def simulate_correlated_final_values(self, amount, means, cholesky, years, weight_matrix,
+                                         num_paths=None, rng=None, drawdowns=False, path_summaries=None):
+        """Simulate correlated asset paths once and evaluate every weight vector on them
+
+        With drawdowns, also returns the (paths, portfolios) maximum drawdowns.
+        path_summaries (one PathSummary per portfolio) receive year-end values.
+        """
+        num_paths = self.num_simulations if num_paths is None else int(num_paths)
+        rng = rng if rng is not None else np.random.default_rng()
+        weight_matrix = np.atleast_2d(weight_matrix)
+
+        final_values = np.empty((num_paths, weight_matrix.shape[0]))
+        path_drawdowns = np.empty_like(final_values) if drawdowns else None
+        start = 0
+        for n in self.iter_chunks(num_paths, years * len(means)):
+            asset_returns = self.simulate_asset_returns(means, cholesky, years, n, rng)
+            self._store_evaluation(asset_returns, amount, weight_matrix, final_values, path_drawdowns, start,
+                                   path_summaries)
+            start += n
+
+        return (final_values, path_drawdowns) if drawdowns else final_values
+
+    def summarize(self, final_values):
+        """Mean, 5th and 95th percentile of simulated terminal values"""
+        final_values = final_values[np.isfinite(final_values)]
+
+        if len(final_values) == 0:
+            return np.nan, np.nan, np.nan
+
+        mean_value = np.mean(final_values)
+        percentile_5, percentile_95 = np.percentile(final_values, [5, 95])
+
+        return mean_value, percentile_5, percentile_95
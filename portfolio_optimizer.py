@@ -1,17 +1,71 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import norm
 import json
+import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from functools import wraps
+from monte_carlo_engine import MonteCarloEngine
+from result_cache import ResultCache, canonical_hash
+from efficient_frontier import EfficientFrontier
+from streaming_stats import PathSummary, max_drawdowns
+from asset_universe import AssetUniverse
+from asset_data import AssetDataSnapshot, DataFileWatcher, read_table
+
+
+def _snapshot_attribute(name):
+    return property(lambda self: getattr(self.snapshot, name), doc=f"{name} of the current data snapshot")
+
+
+def uses_snapshot(method):
+    """Run a request-level method against one pinned data snapshot"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.pinned_snapshot():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class PortfolioOptimizer:
     def __init__(self):
         # Constants
         self.NUM_SIMULATIONS = 10000
+        self.MAX_SIMULATIONS = 5000000
+        self.STREAMING_THRESHOLD = 200000
+        self.MC_MEMORY_LIMIT_MB = 64
+        self.MC_WORKERS = int(os.environ.get("MC_WORKERS", 1))
+        self.MC_EXECUTOR = os.environ.get("MC_EXECUTOR", "thread")
         self.MIN_REAL_ESTATE_INVESTMENT = 1000000
+        self.FRONTIER_POINTS = 201
+        self.FAN_CHART_PERCENTILES = [5, 25, 50, 75, 95]
+        self.HISTOGRAM_BINS = 50
+        self.MAX_HISTOGRAM_BINS = 1000
+        # VaR/CVaR are reported at 95% confidence (5th percentile of terminal value)
+        self.VAR_PERCENTILE = 5
+        self.GOAL_SEEK_MAX_YEARS = 50
+        self.SWEEP_DIMENSIONS = ["investment_horizon", "expected_inflation", "investment_amount", "financial_goal"]
+        self.MAX_SWEEP_POINTS = 10000
+        self.GOAL_SEEK_MAX_ITERATIONS = 100
+        # Maximum portfolio volatility accepted for frontier allocations
+        self.RISK_VOLATILITY_CAPS = {
+            "conservative": 0.06,
+            "moderate": 0.12,
+            "aggressive": 0.20
+        }
+        self.CACHE_MAX_ENTRIES = int(os.environ.get("PORTFOLIO_CACHE_ENTRIES", 1024))
+        self.CACHE_TTL_SECONDS = int(os.environ.get("PORTFOLIO_CACHE_TTL", 3600))
+        self.CACHE_MAX_BYTES = int(os.environ.get("PORTFOLIO_CACHE_BYTES", 32 * 1024 * 1024))
+        
+        # Asset metrics and tax rates (CSV or Parquet; columns asset, cagr, volatility, beta, liquidity, tax_rate)
+        self.ASSET_DATA_FILE = os.environ.get(
+            "PORTFOLIO_ASSET_DATA_FILE",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "asset_data.csv")
+        )
+        self.DATA_WATCH_INTERVAL = float(os.environ.get("PORTFOLIO_DATA_WATCH_INTERVAL", 5))
         
-        # Tax rates for different investment avenues
-        self.tax_rates = {
+        # Tax rates used when the asset data file has no tax_rate column
+        self.DEFAULT_TAX_RATES = {
             "Fixed Deposits": 0.30,
             "Government securities": 0.10,
             "Equity": 0.125,
@@ -20,12 +74,138 @@ class PortfolioOptimizer:
             "Gold": 0.125
         }
         
-        # Load investment data (you can modify this path)
-        self.investment_data = self.load_investment_data()
+        # Stress scenario library: portfolio drop per avenue for each scenario
+        self.STRESS_SCENARIOS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stress_scenarios.csv")
+        self.DEFAULT_STRESS_SCENARIO = "Market Crash"
+        
+        # Locally cached panel of historical annual returns per avenue for bootstrapping
+        self.HISTORICAL_RETURNS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "historical_returns.csv")
+        self.BOOTSTRAP_BLOCK_LENGTH = 5
+        
+        # Load investment data into an immutable snapshot; reloads swap the whole snapshot
+        self._local = threading.local()
+        self._reload_lock = threading.Lock()
+        self._snapshot = self.build_snapshot()
+        self.data_watcher = None
+        # Callables invoked with the new data version after a reload changes the data
+        self.reload_listeners = []
+        
+        # Vectorized Monte Carlo engine
+        self.mc_engine = MonteCarloEngine(
+            self.NUM_SIMULATIONS, self.MC_MEMORY_LIMIT_MB, self.MC_WORKERS, self.MC_EXECUTOR
+        )
+        
+        # Cache of optimize_portfolio results keyed on canonical inputs
+        self.result_cache = ResultCache(self.CACHE_MAX_ENTRIES, self.CACHE_TTL_SECONDS, self.CACHE_MAX_BYTES)
+    
+    # Asset data is read through the current snapshot
+    investment_data = _snapshot_attribute("investment_data")
+    tax_rates = _snapshot_attribute("tax_rates")
+    stress_scenarios = _snapshot_attribute("stress_scenarios")
+    stress_descriptions = _snapshot_attribute("stress_descriptions")
+    stress_impacts = _snapshot_attribute("stress_impacts")
+    universe = _snapshot_attribute("universe")
+    asset_correlations = _snapshot_attribute("asset_correlations")
+    historical_returns = _snapshot_attribute("historical_returns")
+    frontiers = _snapshot_attribute("frontiers")
+    data_version = _snapshot_attribute("data_version")
+    
+    @property
+    def snapshot(self):
+        """Snapshot pinned by the current request, or the latest published one"""
+        return getattr(self._local, "snapshot", None) or self._snapshot
+    
+    @contextmanager
+    def pinned_snapshot(self):
+        """Keep the current thread on one snapshot, even if a reload publishes a new one"""
+        if getattr(self._local, "snapshot", None) is not None:
+            yield self._local.snapshot
+            return
+        self._local.snapshot = self._snapshot
+        try:
+            yield self._local.snapshot
+        finally:
+            self._local.snapshot = None
+    
+    def build_snapshot(self):
+        """Load the data files and derive everything one data version needs"""
+        investment_data, tax_rates = self.load_asset_data()
+        assets = list(investment_data.keys())
+        stress_scenarios, stress_descriptions = self.load_stress_scenarios(assets)
+        stress_impacts = stress_scenarios.loc[self.DEFAULT_STRESS_SCENARIO].to_dict()
+        universe = AssetUniverse.from_dicts(investment_data, tax_rates, stress_impacts)
+        asset_correlations = self.load_asset_correlations(assets)
+        historical_returns = self.load_historical_returns(assets)
+        covariance = asset_correlations.values * np.outer(universe.volatility, universe.volatility)
+        
+        return AssetDataSnapshot(
+            investment_data=investment_data,
+            tax_rates=tax_rates,
+            stress_scenarios=stress_scenarios,
+            stress_descriptions=stress_descriptions,
+            stress_impacts=stress_impacts,
+            universe=universe,
+            asset_correlations=asset_correlations,
+            historical_returns=historical_returns,
+            covariance=covariance,
+            cholesky_factor=np.linalg.cholesky(covariance),
+            frontiers=self.build_frontiers(universe, covariance),
+            data_version=self.compute_data_version(
+                investment_data, tax_rates, stress_scenarios, asset_correlations, historical_returns
+            )
+        )
+    
+    def compute_data_version(self, investment_data, tax_rates, stress_scenarios, asset_correlations, historical_returns):
+        """Short hash identifying a set of asset data and tax rates"""
+        return canonical_hash(
+            investment_data, tax_rates, stress_scenarios.to_dict(),
+            asset_correlations.values.tolist(),
+            historical_returns.values.tolist() if historical_returns is not None else None
+        )[:12]
+    
+    def reload_investment_data(self):
+        """Reload the data files and atomically publish a new snapshot (the current one stays if loading fails)"""
+        with self._reload_lock:
+            snapshot = self.build_snapshot()
+            changed = snapshot.data_version != self._snapshot.data_version
+            self._snapshot = snapshot
+        if changed:
+            self.result_cache.clear()
+            for listener in self.reload_listeners:
+                listener(snapshot.data_version)
+        return snapshot.data_version
+    
+    def start_data_watcher(self, interval=None):
+        """Watch the data files and hot-reload them when they change"""
+        if self.data_watcher is None:
+            self.data_watcher = DataFileWatcher(
+                [self.ASSET_DATA_FILE, self.STRESS_SCENARIOS_FILE, self.HISTORICAL_RETURNS_FILE],
+                self.reload_investment_data, interval or self.DATA_WATCH_INTERVAL
+            )
+        return self.data_watcher.start()
+    
+    def load_asset_data(self):
+        """Load per-avenue metrics and tax rates from the asset data file (sample data if the file is missing)"""
+        if not os.path.exists(self.ASSET_DATA_FILE):
+            return self.load_investment_data(), dict(self.DEFAULT_TAX_RATES)
+        try:
+            table = read_table(self.ASSET_DATA_FILE).set_index("asset")
+            metrics = table.reindex(columns=["cagr", "volatility", "beta", "liquidity"]).astype(float)
+        except KeyError as e:
+            raise ValueError(f"Asset data file is missing column {e}.")
+        if metrics[["cagr", "volatility"]].isna().any().any():
+            raise ValueError("Asset data file needs cagr and volatility for every asset.")
+        
+        investment_data = metrics.fillna(0.0).to_dict(orient="index")
+        if "tax_rate" in table:
+            # Avenues without a rate are taxed at the investor's bracket
+            tax_rates = table["tax_rate"].dropna().astype(float).to_dict()
+        else:
+            tax_rates = dict(self.DEFAULT_TAX_RATES)
+        return investment_data, tax_rates
     
     def load_investment_data(self):
-        """Load investment metrics data - you can modify this to load from your CSV"""
-        # Sample data structure - replace with your actual data loading
+        """Built-in sample investment metrics, used when no asset data file is present"""
         sample_data = {
             "Fixed Deposits": {
                 "cagr": 0.065,
@@ -66,6 +246,75 @@ class PortfolioOptimizer:
         }
         return sample_data
     
+    def load_stress_scenarios(self, assets):
+        """Load the (scenarios x assets) stress scenario matrix and descriptions (built-in crash if the file is missing)"""
+        if os.path.exists(self.STRESS_SCENARIOS_FILE):
+            try:
+                scenarios = read_table(self.STRESS_SCENARIOS_FILE).set_index("scenario")
+                descriptions = scenarios.pop("description").to_dict() if "description" in scenarios else {}
+                scenarios = scenarios.reindex(columns=assets).fillna(0.0).astype(float)
+            except KeyError as e:
+                raise ValueError(f"Stress scenario file is missing column {e}.")
+            except ValueError as e:
+                raise ValueError(f"Stress scenario file is malformed: {e}")
+            if self.DEFAULT_STRESS_SCENARIO not in scenarios.index:
+                raise ValueError(f"Stress scenario file needs a '{self.DEFAULT_STRESS_SCENARIO}' scenario.")
+        else:
+            scenarios = pd.DataFrame([{
+                "Fixed Deposits": 0.00,
+                "Government securities": 0.05,
+                "Equity": 0.30,
+                "Mutual Fund": 0.25,
+                "Real Estate": 0.20,
+                "Gold": 0.10
+            }], index=[self.DEFAULT_STRESS_SCENARIO]).reindex(columns=assets).fillna(0.0)
+            descriptions = {}
+        return scenarios, descriptions
+    
+    def load_historical_returns(self, assets):
+        """Load the (years x assets) panel of historical annual returns, or None if there is no file"""
+        if not os.path.exists(self.HISTORICAL_RETURNS_FILE):
+            return None
+        try:
+            history = read_table(self.HISTORICAL_RETURNS_FILE).set_index("year").sort_index()
+            history = history.reindex(columns=assets).fillna(0.0).astype(float)
+        except KeyError as e:
+            raise ValueError(f"Historical returns file is missing column {e}.")
+        except ValueError as e:
+            raise ValueError(f"Historical returns file is malformed: {e}")
+        if history.empty:
+            raise ValueError("Historical returns file has no rows.")
+        return history
+    
+    def load_asset_correlations(self, assets):
+        """Load the correlation matrix of annual returns between investment avenues"""
+        names = ["Fixed Deposits", "Gold", "Equity", "Mutual Fund", "Real Estate", "Government securities"]
+        correlations = pd.DataFrame([
+            [1.00, 0.00, 0.00, 0.00, 0.10, 0.30],
+            [0.00, 1.00, -0.10, -0.05, 0.10, 0.10],
+            [0.00, -0.10, 1.00, 0.90, 0.40, -0.10],
+            [0.00, -0.05, 0.90, 1.00, 0.35, 0.00],
+            [0.10, 0.10, 0.40, 0.35, 1.00, 0.10],
+            [0.30, 0.10, -0.10, 0.00, 0.10, 1.00]
+        ], index=names, columns=names)
+        # Follow the asset data ordering; avenues without estimates are uncorrelated
+        correlations = correlations.reindex(index=assets, columns=assets).fillna(0.0)
+        values = correlations.values.copy()
+        np.fill_diagonal(values, 1.0)
+        return pd.DataFrame(values, index=assets, columns=assets)
+    
+    def get_covariance_matrix(self):
+        """Covariance matrix built from asset volatilities and correlations"""
+        return self.snapshot.covariance
+    
+    def get_cholesky_factor(self):
+        """Lower-triangular Cholesky factor of the covariance matrix (computed once per snapshot)"""
+        return self.snapshot.cholesky_factor
+    
+    def weights_to_vector(self, weights):
+        """Convert a weights dict to an array in asset universe order"""
+        return self.universe.weights_vector(weights)
+    
     def validate_inputs(self, inputs):
         """Validate user inputs"""
         emergency_fund = inputs["monthly_expenses"] * 6
@@ -86,7 +335,10 @@ class PortfolioOptimizer:
         if inputs["investment_horizon"] <= 0:
             raise ValueError("Investment horizon must be at least 1 year.")
         
-        return inputs
+        if inputs["investment_horizon"] != int(inputs["investment_horizon"]):
+            raise ValueError("Investment horizon must be a whole number of years.")
+        
+        return dict(inputs, investment_horizon=int(inputs["investment_horizon"]))
     
     def calculate_required_return(self, inputs):
         """Calculate required return to reach financial goal"""
@@ -170,30 +422,51 @@ class PortfolioOptimizer:
         
         return weights, selected_assets
     
-    def calculate_portfolio_metrics(self, weights, inputs):
-        """Calculate portfolio-level metrics"""
-        portfolio_cagr = 0
-        portfolio_volatility = 0
-        portfolio_beta = 0
+    def allocate(self, inputs):
+        """Allocate with the method requested in the inputs ('rules' or 'frontier')"""
+        if inputs.get("allocation_method") == "frontier":
+            return self.allocate_assets_frontier(inputs)
+        return self.allocate_assets(inputs)
+    
+    def build_frontiers(self, universe, covariance):
+        """Precompute efficient frontiers with and without Real Estate eligibility"""
+        assets = universe.assets
+        means = universe.cagr
+        return {
+            True: EfficientFrontier(assets, means, covariance, num_points=self.FRONTIER_POINTS),
+            False: EfficientFrontier(assets, means, covariance, excluded=["Real Estate"],
+                                     num_points=self.FRONTIER_POINTS)
+        }
+    
+    def allocate_assets_frontier(self, inputs):
+        """Allocate on the precomputed efficient frontier for the required return, within the risk tolerance's volatility cap"""
+        frontier = self.frontiers[inputs["investment_amount"] >= self.MIN_REAL_ESTATE_INVESTMENT]
+        risk_tolerance = inputs["risk_tolerance"]
+        if inputs["investment_experience"] == "none":
+            risk_tolerance = "conservative"
+        vol_cap = self.RISK_VOLATILITY_CAPS.get(risk_tolerance, self.RISK_VOLATILITY_CAPS["aggressive"])
         
-        for avenue, weight in weights.items():
-            if weight > 0 and avenue in self.investment_data:
-                asset_data = self.investment_data[avenue]
-                portfolio_cagr += weight * asset_data["cagr"]
-                portfolio_volatility += weight * asset_data["volatility"]
-                portfolio_beta += weight * asset_data["beta"]
+        required_return = self.calculate_required_return(inputs)
+        if np.isfinite(required_return) and frontier.volatility_for_return(required_return) <= vol_cap:
+            weight_vector = frontier.weights_for_return(required_return)
+        else:
+            weight_vector = frontier.weights_for_volatility(vol_cap)
         
-        # Tax-adjusted return
-        tax_adj_cagr = 0
-        for avenue, weight in weights.items():
-            if weight > 0 and avenue in self.investment_data:
-                asset_data = self.investment_data[avenue]
-                tax_rate = self.tax_rates.get(avenue, inputs["tax_bracket"])
-                tax_adj_cagr += weight * asset_data["cagr"] * (1 - tax_rate)
+        # Drop solver dust so the allocation only lists meaningful holdings
+        weight_vector = np.where(weight_vector < 1e-4, 0, weight_vector)
+        weight_vector /= weight_vector.sum()
+        return self.universe.weights_dict(weight_vector), {}
+    
+    def calculate_portfolio_metrics(self, weights, inputs):
+        """Calculate portfolio-level metrics"""
+        # Negative weights are ignored, as in the per-avenue rules
+        weight_vector = np.clip(self.universe.weights_vector(weights), 0, None)
+        metrics = self.universe.portfolio_metrics(weight_vector, inputs["tax_bracket"])
         
-        real_return = tax_adj_cagr - inputs["expected_inflation"]
+        real_return = metrics["tax_adj_cagr"] - inputs["expected_inflation"]
         
-        return portfolio_cagr, tax_adj_cagr, real_return, portfolio_volatility, portfolio_beta
+        return (float(metrics["cagr"]), float(metrics["tax_adj_cagr"]), float(real_return),
+                float(metrics["volatility"]), float(metrics["beta"]))
     
     def project_growth(self, inputs, portfolio_cagr_annual, real_return_annual):
         """Project portfolio growth over time"""
@@ -218,66 +491,598 @@ class PortfolioOptimizer:
         
         return nominal_value, real_value
     
-    def monte_carlo_simulation(self, inputs, portfolio_cagr, portfolio_volatility):
+    def monte_carlo_simulation(self, inputs, portfolio_cagr, portfolio_volatility, weights=None):
         """Run Monte Carlo simulation for portfolio projections"""
+        mc_results = self.run_monte_carlo(inputs, portfolio_cagr, portfolio_volatility, weights)
+        return mc_results["mean_value"], mc_results["percentile_5"], mc_results["percentile_95"]
+    
+    def simulation_count(self, inputs):
+        """Requested number of simulated paths (NUM_SIMULATIONS if unset), between 1 and MAX_SIMULATIONS"""
+        requested = inputs.get("num_simulations")
+        if requested is None:
+            return self.NUM_SIMULATIONS
+        try:
+            num_paths = int(requested)
+            whole = num_paths == float(requested)
+        except (TypeError, ValueError):
+            whole = False
+        if not whole or not 1 <= num_paths <= self.MAX_SIMULATIONS:
+            raise ValueError(f"Number of simulations must be a whole number between 1 and {self.MAX_SIMULATIONS:,}.")
+        return num_paths
+    
+    def run_monte_carlo(self, inputs, portfolio_cagr, portfolio_volatility, weights=None, keep_values=False):
+        """Run Monte Carlo simulation and return the full results block (plus "final_values" with keep_values)"""
         years = inputs["investment_horizon"]
         amount = inputs["investment_amount"]
+        num_paths = self.simulation_count(inputs)
+        extra_percentiles = inputs.get("percentiles") or []
+        
+        # Multi-asset modes fold year-end values into a PathSummary for the fan chart
+        path_summary = PathSummary(int(years), inputs["financial_goal"]) if inputs.get("fan_chart") else None
+        
+        if inputs.get("simulation_mode") == "correlated" and weights is not None:
+            final_values, drawdowns = (a[:, 0] for a in self.correlated_monte_carlo(inputs, [weights], path_summary))
+            mc_results = self.summarize_final_values(final_values, extra_percentiles, amount, drawdowns)
+            self.attach_fan_chart(mc_results, path_summary)
+            return self.attach_distribution(mc_results, final_values, inputs, keep_values)
+        
+        if inputs.get("simulation_mode") == "monthly" and weights is not None:
+            return self.monthly_monte_carlo(inputs, weights, keep_values, path_summary)
+        
+        if inputs.get("simulation_mode") == "bootstrap" and weights is not None:
+            if self.historical_returns is None:
+                raise ValueError("Historical return data is not available for bootstrap simulation.")
+            final_values, drawdowns = (a[:, 0] for a in self.mc_engine.simulate_bootstrap_final_values(
+                amount, self.historical_returns.values,
+                self.universe.weights_vector(weights),
+                years, num_paths, np.random.default_rng(inputs.get("seed")),
+                method=inputs.get("bootstrap_method") or "stationary",
+                block_length=inputs.get("block_length") or self.BOOTSTRAP_BLOCK_LENGTH,
+                drawdowns=True,
+                path_summaries=None if path_summary is None else [path_summary]
+            ))
+            mc_results = self.summarize_final_values(final_values, extra_percentiles, amount, drawdowns)
+            self.attach_fan_chart(mc_results, path_summary)
+            return self.attach_distribution(mc_results, final_values, inputs, keep_values)
         
         sim_cagr = portfolio_cagr if np.isfinite(portfolio_cagr) else 0
         sim_volatility = portfolio_volatility if np.isfinite(portfolio_volatility) else 0
         
         if sim_volatility <= 0:
             final_value = amount * (1 + sim_cagr) ** years
-            return final_value, final_value, final_value
+            mc_results = {"mean_value": final_value, "percentile_5": final_value, "percentile_95": final_value}
+            if extra_percentiles:
+                mc_results["percentiles"] = {f"p{p:g}": final_value for p in extra_percentiles}
+            drawdown = max_drawdowns(amount * (1 + sim_cagr) ** np.arange(1, int(years) + 1)[None, :], amount)[0]
+            mc_results.update(self.tail_risk_metrics(amount, final_value, final_value, drawdown, drawdown))
+            if inputs.get("fan_chart"):
+                yearly_values = amount * (1 + sim_cagr) ** np.arange(1, int(years) + 1)
+                mc_results["yearly"] = self.build_fan_chart(
+                    yearly_values, {p: yearly_values for p in self.FAN_CHART_PERCENTILES},
+                    (yearly_values >= inputs["financial_goal"]).astype(float)
+                )
+            return self.attach_distribution(mc_results, np.full(num_paths, final_value), inputs, keep_values)
         
-        final_values = []
-        for _ in range(self.NUM_SIMULATIONS):
-            annual_returns = norm.rvs(loc=sim_cagr, scale=sim_volatility, size=years)
-            annual_returns = np.maximum(annual_returns, -0.99)
-            final_value = amount * np.prod(1 + annual_returns)
-            final_values.append(final_value)
+        # Variance-reduced sampling with optional adaptive stopping
+        if inputs.get("variance_reduction") or inputs.get("control_variate") or inputs.get("tolerance"):
+            if inputs.get("fan_chart"):
+                raise ValueError("Fan charts are not available with variance reduction or adaptive stopping.")
+            control_mean = None
+            if inputs.get("control_variate"):
+                control_mean, _ = self.project_growth(inputs, sim_cagr, 0)
+            stats = self.mc_engine.adaptive_final_values(
+                amount, sim_cagr, sim_volatility, years,
+                method=inputs.get("variance_reduction") or "standard",
+                control_mean=control_mean,
+                tolerance=inputs.get("tolerance"),
+                max_paths=num_paths,
+                seed=inputs.get("seed"),
+                store_values=num_paths <= self.STREAMING_THRESHOLD
+            )
+            if "final_values" in stats:
+                mc_results = self.summarize_final_values(stats["final_values"], extra_percentiles, amount, stats["drawdowns"])
+                self.attach_distribution(mc_results, stats["final_values"], inputs, keep_values)
+            else:
+                mc_results = self.summarize_streaming(
+                    stats["summary"], stats["drawdown_summary"], extra_percentiles, amount, inputs
+                )
+            # The control-variate estimate replaces the plain mean
+            mc_results["mean_value"] = stats["mean_value"]
+            mc_results["num_simulations"] = stats["num_simulations"]
+            mc_results["relative_error"] = max(stats["mean_rel_error"], stats["percentile_5_rel_error"],
+                                               stats["percentile_95_rel_error"])
+            return mc_results
         
-        final_values = np.array(final_values)
-        final_values = final_values[np.isfinite(final_values)]
+        # Large path counts are aggregated in fixed memory instead of materialized
+        if num_paths > self.STREAMING_THRESHOLD:
+            if inputs.get("fan_chart"):
+                path_summary = self.mc_engine.parallel_final_values(
+                    amount, sim_cagr, sim_volatility, years, num_paths, inputs.get("seed"),
+                    collect="path_summary", goal=inputs["financial_goal"]
+                )
+                summary, drawdowns = path_summary.yearly[-1], path_summary.drawdowns
+            else:
+                summary, drawdowns = self.mc_engine.parallel_final_values(
+                    amount, sim_cagr, sim_volatility, years, num_paths, inputs.get("seed"), collect="risk_summary"
+                )
+            mc_results = self.summarize_streaming(summary, drawdowns, extra_percentiles, amount, inputs)
+            return self.attach_fan_chart(mc_results, path_summary)
         
-        if len(final_values) == 0:
-            return np.nan, np.nan, np.nan
+        if inputs.get("fan_chart"):
+            # Keep the year-end value matrix; its last column is the terminal value
+            path_values = self.mc_engine.parallel_final_values(
+                amount, sim_cagr, sim_volatility, years, num_paths, inputs.get("seed"), collect="paths"
+            )
+            final_values = path_values[:, -1]
+            drawdowns = max_drawdowns(path_values, amount)
+        else:
+            final_values, drawdowns = self.mc_engine.parallel_final_values(
+                amount, sim_cagr, sim_volatility, years, num_paths, inputs.get("seed"), collect="risk_values"
+            )
+        mc_results = self.summarize_final_values(final_values, extra_percentiles, amount, drawdowns)
+        if inputs.get("fan_chart"):
+            bands = np.percentile(path_values, self.FAN_CHART_PERCENTILES, axis=0)
+            mc_results["yearly"] = self.build_fan_chart(
+                path_values.mean(axis=0),
+                dict(zip(self.FAN_CHART_PERCENTILES, bands)),
+                np.mean(path_values >= inputs["financial_goal"], axis=0)
+            )
+        return self.attach_distribution(mc_results, final_values, inputs, keep_values)
+    
+    def attach_distribution(self, mc_results, final_values, inputs, keep_values=False):
+        """Add the requested histogram and, if asked, the raw terminal values to a results block"""
+        if inputs.get("histogram"):
+            mc_results["histogram"] = self.build_histogram(
+                final_values, inputs.get("histogram_bins"), inputs.get("histogram_log_bins")
+            )
+        if keep_values:
+            mc_results["final_values"] = final_values
+        return mc_results
+    
+    def build_histogram(self, values, bins=None, log_bins=False, weights=None):
+        """Binned distribution of terminal values via np.histogram, optionally on geometric (log-scale) bins"""
+        bins = self.HISTOGRAM_BINS if bins is None else int(bins)
+        if not 1 <= bins <= self.MAX_HISTOGRAM_BINS:
+            raise ValueError(f"Histogram bins must be between 1 and {self.MAX_HISTOGRAM_BINS}.")
+        values = np.asarray(values, dtype=float)
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=float)
+        finite = np.isfinite(values)
+        values, weights = values[finite], weights[finite]
+        below_range = 0.0
+        if log_bins:
+            positive = values > 0
+            below_range = float(weights[~positive].sum())
+            values, weights = values[positive], weights[positive]
+            if len(values) == 0:
+                return {"bin_edges": [], "counts": [], "log_bins": True, "below_range": below_range}
+            low, high = values.min(), values.max()
+            edges = np.geomspace(low, high if high > low else low * 1.01, bins + 1)
+        else:
+            edges = bins
+        counts, edges = np.histogram(values, bins=edges, weights=weights)
+        return {
+            "bin_edges": [float(e) for e in edges],
+            "counts": [int(round(c)) for c in counts],
+            "log_bins": bool(log_bins),
+            "below_range": int(round(below_range))
+        }
+    
+    def tail_risk_metrics(self, amount, var_value, tail_mean_value, mean_drawdown=np.nan, drawdown_95=np.nan):
+        """VaR / CVaR as losses against the invested amount, plus maximum drawdown statistics"""
+        return {
+            "value_at_risk_95": amount - var_value,
+            "conditional_value_at_risk_95": amount - tail_mean_value,
+            "expected_max_drawdown_percent": mean_drawdown * 100,
+            "max_drawdown_95_percent": drawdown_95 * 100
+        }
+    
+    def summarize_final_values(self, final_values, extra_percentiles=(), amount=None, drawdowns=None):
+        """Mean/p5/p95, extra percentiles and (given the amount) tail risk of terminal values"""
+        mean_value, p5, p95 = self.mc_engine.summarize(final_values)
+        mc_results = {"mean_value": mean_value, "percentile_5": p5, "percentile_95": p95}
+        finite_values = final_values[np.isfinite(final_values)]
+        if extra_percentiles:
+            mc_results["percentiles"] = {
+                f"p{p:g}": np.percentile(finite_values, p) if len(finite_values) else np.nan
+                for p in extra_percentiles
+            }
+        if amount is not None and len(finite_values):
+            var_value = np.percentile(finite_values, self.VAR_PERCENTILE)
+            tail_mean_value = finite_values[finite_values <= var_value].mean()
+            mean_drawdown, drawdown_95 = np.nan, np.nan
+            if drawdowns is not None and len(drawdowns):
+                mean_drawdown, drawdown_95 = drawdowns.mean(), np.percentile(drawdowns, 95)
+            mc_results.update(self.tail_risk_metrics(amount, var_value, tail_mean_value, mean_drawdown, drawdown_95))
+        return mc_results
+    
+    def summarize_streaming(self, summary, drawdowns, extra_percentiles, amount, inputs):
+        """Results block from streaming summaries of terminal values and drawdowns"""
+        mc_results = {
+            "mean_value": summary.mean,
+            "percentile_5": summary.percentile(5),
+            "percentile_95": summary.percentile(95)
+        }
+        if extra_percentiles:
+            mc_results["percentiles"] = {f"p{p:g}": summary.percentile(p) for p in extra_percentiles}
+        mc_results.update(self.tail_risk_metrics(
+            amount, summary.percentile(self.VAR_PERCENTILE), summary.tail_mean(self.VAR_PERCENTILE),
+            drawdowns.mean, drawdowns.percentile(95)
+        ))
+        if inputs.get("histogram"):
+            # Approximate: bucket representatives of the quantile sketch
+            values, counts = summary.sketch.weighted_values()
+            mc_results["histogram"] = self.build_histogram(
+                values, inputs.get("histogram_bins"), inputs.get("histogram_log_bins"), counts
+            )
+        return mc_results
+    
+    def attach_fan_chart(self, mc_results, path_summary):
+        """Add the fan chart of a PathSummary (if one was collected) to a results block"""
+        if path_summary is not None:
+            mc_results["yearly"] = self.build_fan_chart(
+                path_summary.means(),
+                {p: path_summary.percentiles(p) for p in self.FAN_CHART_PERCENTILES},
+                path_summary.goal_probability()
+            )
+        return mc_results
+    
+    def build_fan_chart(self, means, bands, goal_probability):
+        """Per-year mean, percentile bands and goal-attainment probability"""
+        fan_chart = {
+            "year": list(range(1, len(means) + 1)),
+            "mean_value": [float(v) for v in means]
+        }
+        for p, values in bands.items():
+            fan_chart[f"percentile_{p:g}"] = [float(v) for v in values]
+        fan_chart["goal_probability"] = [float(v) for v in goal_probability]
+        return fan_chart
+    
+    def monthly_monte_carlo(self, inputs, weights, keep_values=False, path_summary=None):
+        """Monthly-step simulation with SIP contributions and rebalancing of the allocation"""
+        means = self.universe.cagr
+        num_paths = self.simulation_count(inputs)
+        years = inputs["investment_horizon"]
+        monthly_contribution = inputs.get("monthly_contribution") or 0
+        step_up = inputs.get("sip_step_up") or 0
         
-        mean_value = np.mean(final_values)
-        percentile_5 = np.percentile(final_values, 5)
-        percentile_95 = np.percentile(final_values, 95)
+        rng = np.random.default_rng(inputs.get("seed"))
+        final_values = self.mc_engine.simulate_monthly_final_values(
+            inputs["investment_amount"], self.weights_to_vector(weights), means,
+            self.get_covariance_matrix(), years, num_paths, rng,
+            monthly_contribution=monthly_contribution,
+            step_up=step_up,
+            rebalance=inputs.get("rebalancing") or "annual",
+            threshold=inputs.get("rebalance_threshold") or 0.05,
+            path_summary=path_summary
+        )
         
-        return mean_value, percentile_5, percentile_95
+        months = int(round(years * 12))
+        total_contributions = monthly_contribution * np.sum((1 + step_up) ** (np.arange(months) // 12))
+        total_invested = float(inputs["investment_amount"] + total_contributions)
+        # VaR / CVaR against the total invested; no drawdowns, as contributions mask falls in value
+        mc_results = self.summarize_final_values(final_values, inputs.get("percentiles") or [], total_invested)
+        mc_results["total_invested"] = total_invested
+        mc_results["goal_probability"] = np.mean(final_values >= inputs["financial_goal"])
+        self.attach_fan_chart(mc_results, path_summary)
+        return self.attach_distribution(mc_results, final_values, inputs, keep_values)
+    
+    def correlated_monte_carlo(self, inputs, weight_sets, path_summary=None):
+        """Terminal values and maximum drawdowns (paths, weight sets) of every weight set on one draw of correlated asset paths (year-end values of the first into path_summary)"""
+        years = inputs["investment_horizon"]
+        amount = inputs["investment_amount"]
+        num_paths = self.simulation_count(inputs)
+        
+        means = self.universe.cagr
+        weight_matrix = self.universe.weights_matrix(weight_sets)
+        
+        rng = np.random.default_rng(inputs.get("seed"))
+        return self.mc_engine.simulate_correlated_final_values(
+            amount, means, self.get_cholesky_factor(), years, weight_matrix, num_paths, rng, drawdowns=True,
+            path_summaries=None if path_summary is None else [path_summary]
+        )
+    
+    @uses_snapshot
+    def compare_profiles(self, user_inputs, profiles=None):
+        """Compare risk/experience profiles on one shared set of simulated returns"""
+        try:
+            validated_inputs = self.validate_inputs(user_inputs)
+            if profiles is None:
+                profiles = [
+                    {"risk_tolerance": risk, "investment_experience": experience}
+                    for risk in ["conservative", "moderate", "aggressive"]
+                    for experience in ["none", "intermediate", "advanced"]
+                ]
+            
+            required_return = self.calculate_required_return(validated_inputs)
+            rows = []
+            for profile in profiles:
+                profile_inputs = dict(validated_inputs, **profile)
+                weights, selected_assets = self.allocate_assets(profile_inputs)
+                metrics = self.calculate_portfolio_metrics(weights, profile_inputs)
+                rows.append((profile, weights, selected_assets, metrics))
+            
+            years = validated_inputs["investment_horizon"]
+            amount = validated_inputs["investment_amount"]
+            num_paths = self.simulation_count(validated_inputs)
+            rng = np.random.default_rng(validated_inputs.get("seed"))
+            if validated_inputs.get("simulation_mode") == "correlated":
+                weight_matrix = self.universe.weights_matrix([w for _, w, _, _ in rows])
+                final_values = self.mc_engine.simulate_correlated_final_values(
+                    amount, self.universe.cagr, self.get_cholesky_factor(), years, weight_matrix, num_paths, rng
+                )
+            else:
+                cagrs = [m[0] if np.isfinite(m[0]) else 0 for _, _, _, m in rows]
+                vols = [m[3] if np.isfinite(m[3]) else 0 for _, _, _, m in rows]
+                final_values = self.mc_engine.simulate_profiles(amount, cagrs, vols, years, num_paths, rng)
+            
+            comparison = []
+            for i, (profile, weights, selected_assets, metrics) in enumerate(rows):
+                portfolio_cagr, tax_adj_cagr, real_return, volatility, beta = metrics
+                nominal_value, real_value = self.project_growth(validated_inputs, portfolio_cagr, real_return)
+                mean_value, p5, p95 = self.mc_engine.summarize(final_values[:, i])
+                comparison.append({
+                    'profile': profile,
+                    'asset_allocation': {k: v * 100 for k, v in weights.items() if v > 0},
+                    'selected_assets': selected_assets,
+                    'portfolio_cagr_percent': portfolio_cagr * 100,
+                    'real_return_percent': real_return * 100,
+                    'portfolio_volatility_percent': volatility * 100,
+                    'projected_nominal_value': nominal_value,
+                    'projected_real_value': real_value,
+                    'monte_carlo_results': self.format_monte_carlo_results({
+                        'mean_value': mean_value,
+                        'percentile_5': p5,
+                        'percentile_95': p95,
+                        'goal_probability': np.mean(final_values[:, i] >= validated_inputs["financial_goal"])
+                    }),
+                    'stress_test_percent': self.stress_test(weights)
+                })
+            
+            return {
+                'required_return_percent': required_return * 100 if np.isfinite(required_return) else None,
+                'num_simulations': num_paths,
+                'profiles': comparison,
+                'data_version': self.data_version
+            }
+            
+        except Exception as e:
+            return {'error': str(e)}
+    
+    @uses_snapshot
+    def goal_seek(self, user_inputs, solve_for="investment_amount", target_probability=0.9):
+        """Solve for the amount, horizon or monthly SIP that reaches the goal with a target probability"""
+        try:
+            if solve_for not in ("investment_amount", "investment_horizon", "monthly_contribution"):
+                raise ValueError("solve_for must be investment_amount, investment_horizon or monthly_contribution.")
+            if not 0 < target_probability < 1:
+                raise ValueError("Target probability must be between 0 and 1.")
+            goal = user_inputs["financial_goal"]
+            amount = user_inputs["investment_amount"]
+            if goal <= 0:
+                raise ValueError("Financial goal must be positive.")
+            
+            weights, _ = self.allocate_assets(user_inputs)
+            portfolio_cagr, _, _, volatility, _ = self.calculate_portfolio_metrics(weights, user_inputs)
+            years = self.GOAL_SEEK_MAX_YEARS if solve_for == "investment_horizon" else int(user_inputs["investment_horizon"])
+            if years <= 0:
+                raise ValueError("Investment horizon must be at least 1 year.")
+            num_paths = self.simulation_count(user_inputs)
+            
+            result = {'solve_for': solve_for, 'target_probability': target_probability, 'data_version': self.data_version}
+            if solve_for == "investment_horizon":
+                # Per-year goal attainment, reduced chunk by chunk
+                goal_hits = self.mc_engine.parallel_final_values(
+                    amount, portfolio_cagr, max(volatility, 0), years, num_paths, user_inputs.get("seed"),
+                    collect="goal_hits", goal=goal
+                )
+                probabilities = goal_hits / num_paths
+                reached = np.flatnonzero(probabilities >= target_probability)
+                result['value'] = int(reached[0] + 1) if len(reached) else None
+                result['achieved_probability'] = float(probabilities[reached[0]]) if len(reached) else float(probabilities.max())
+                result['iterations'] = 1
+                return result
+            
+            # Terminal growth of one rupee invested now and of one rupee a year, per path
+            terminal_growth, annuity_growth = self.mc_engine.parallel_final_values(
+                1.0, portfolio_cagr, max(volatility, 0), years, num_paths, user_inputs.get("seed"),
+                collect="annuity_values"
+            )
+            if solve_for == "investment_amount":
+                def probability(x):
+                    return np.mean(x * terminal_growth >= goal)
+                upper = goal
+            else:
+                # Value at horizon of 12 * SIP paid at the start of every year
+                annuity_growth *= 12
+                lump_sum = amount * terminal_growth
+                
+                def probability(x):
+                    return np.mean(lump_sum + x * annuity_growth >= goal)
+                upper = goal / (12 * years)
+            
+            value, achieved, iterations = self._bisect_probability(probability, upper, target_probability)
+            result.update({'value': value, 'achieved_probability': achieved, 'iterations': iterations})
+            if solve_for == "investment_amount" and value is not None:
+                investable_amount = user_inputs["total_savings"] - user_inputs["monthly_expenses"] * 6
+                result['within_investable_amount'] = bool(value <= investable_amount)
+            return result
+            
+        except Exception as e:
+            return {'error': str(e)}
+    
+    def _bisect_probability(self, probability, upper, target_probability):
+        """Smallest x >= 0 with probability(x) >= target for a non-decreasing probability"""
+        lower = 0.0
+        iterations = 0
+        if probability(lower) >= target_probability:
+            return 0.0, float(probability(lower)), iterations
+        # Expand the bracket until the target is reached
+        while probability(upper) < target_probability:
+            lower, upper = upper, upper * 2
+            iterations += 1
+            if iterations >= self.GOAL_SEEK_MAX_ITERATIONS or not np.isfinite(upper):
+                return None, float(probability(lower)), iterations
+        while upper - lower > max(1.0, upper * 1e-9) and iterations < self.GOAL_SEEK_MAX_ITERATIONS:
+            middle = (lower + upper) / 2
+            if probability(middle) >= target_probability:
+                upper = middle
+            else:
+                lower = middle
+            iterations += 1
+        return upper, float(probability(upper)), iterations
+    
+    @uses_snapshot
+    def sensitivity_sweep(self, user_inputs, grid):
+        """Evaluate projections over a grid of one or two input dimensions in one broadcasted pass"""
+        try:
+            dims = list(grid.keys())
+            if not 1 <= len(dims) <= 2 or any(d not in self.SWEEP_DIMENSIONS for d in dims):
+                raise ValueError(f"Sweep over one or two of: {', '.join(self.SWEEP_DIMENSIONS)}.")
+            axes = [np.asarray(grid[d], dtype=float) for d in dims]
+            if any(len(a) == 0 for a in axes) or np.prod([len(a) for a in axes]) > self.MAX_SWEEP_POINTS:
+                raise ValueError(f"Sweep grid must have between 1 and {self.MAX_SWEEP_POINTS} points.")
+            
+            # Broadcast every input to the grid shape
+            mesh = np.meshgrid(*axes, indexing="ij")
+            cells = {d: np.broadcast_to(np.asarray(user_inputs[d], dtype=float), mesh[0].shape) for d in self.SWEEP_DIMENSIONS}
+            cells.update(dict(zip(dims, mesh)))
+            amount, goal = cells["investment_amount"], cells["financial_goal"]
+            horizon, inflation = cells["investment_horizon"], cells["expected_inflation"]
+            if not np.array_equal(horizon, np.round(horizon)):
+                raise ValueError("Investment horizons in the sweep must be whole years.")
+            horizon = horizon.astype(int)
+            if (amount <= 0).any() or (goal <= 0).any() or (horizon <= 0).any():
+                raise ValueError("Amounts, goals and horizons in the sweep must be positive.")
+            
+            with np.errstate(divide="ignore", invalid="ignore"):
+                required_return = (goal / amount) ** (1 / horizon) - 1
+            
+            # Allocation only depends on the amount through the real estate threshold
+            eligible = amount >= self.MIN_REAL_ESTATE_INVESTMENT
+            metrics = {}
+            for flag in np.unique(eligible):
+                profile_inputs = dict(user_inputs, investment_amount=self.MIN_REAL_ESTATE_INVESTMENT if flag else 0)
+                weights, _ = self.allocate_assets(profile_inputs)
+                metrics[bool(flag)] = self.calculate_portfolio_metrics(weights, profile_inputs)
+            
+            shape = amount.shape
+            cagr, tax_adj_cagr, volatility = np.empty(shape), np.empty(shape), np.empty(shape)
+            for flag, (p_cagr, p_tax_adj, _, p_vol, _) in metrics.items():
+                cagr[eligible == flag], tax_adj_cagr[eligible == flag], volatility[eligible == flag] = p_cagr, p_tax_adj, p_vol
+            real_return = tax_adj_cagr - inflation
+            nominal_value = np.where(cagr <= -1, 0, amount * (1 + cagr) ** horizon)
+            real_value = np.where(real_return <= -1, 0, amount * (1 + real_return) ** horizon)
+            
+            # One shared draw of unit growth paths per distinct (cagr, volatility)
+            max_years = int(horizon.max())
+            num_paths = self.simulation_count(user_inputs)
+            percentiles = [5, 50, 95]
+            mc = {key: np.empty(shape) for key in ["mean_value", "percentile_5", "percentile_50", "percentile_95", "goal_probability"]}
+            for flag, (p_cagr, _, _, p_vol, _) in metrics.items():
+                mask = eligible == flag
+                year_index = horizon[mask] - 1
+                thresholds = goal[mask] / amount[mask]
+                probabilities = np.empty(thresholds.shape)
+                if num_paths > self.STREAMING_THRESHOLD:
+                    # Large path counts are reduced per year in fixed memory, as in run_monte_carlo
+                    path_summary = self.mc_engine.parallel_final_values(
+                        1.0, p_cagr, max(p_vol, 0), max_years, num_paths, user_inputs.get("seed"),
+                        collect="path_summary"
+                    )
+                    growth_means = path_summary.means()
+                    growth_percentiles = [path_summary.percentiles(p) for p in percentiles]
+                    for i, (year, threshold) in enumerate(zip(year_index, thresholds)):
+                        probabilities[i] = path_summary.yearly[year].fraction_at_least(threshold)
+                else:
+                    growth = self.mc_engine.parallel_final_values(
+                        1.0, p_cagr, max(p_vol, 0), max_years, num_paths, user_inputs.get("seed"), collect="paths"
+                    )
+                    growth.sort(axis=0)
+                    growth_means = growth.mean(axis=0)
+                    # Percentiles interpolated on the sorted columns, without np.percentile's copy
+                    growth_percentiles = []
+                    for p in percentiles:
+                        position = p / 100 * (num_paths - 1)
+                        low, high = int(np.floor(position)), int(np.ceil(position))
+                        growth_percentiles.append(growth[low] + (growth[high] - growth[low]) * (position - low))
+                    # P(amount * growth >= goal) from the sorted growth factors of each year
+                    for year in np.unique(year_index):
+                        in_year = year_index == year
+                        below = np.searchsorted(growth[:, year], thresholds[in_year], side="left")
+                        probabilities[in_year] = 1 - below / num_paths
+                mc["mean_value"][mask] = amount[mask] * growth_means[year_index]
+                for p, values in zip(percentiles, growth_percentiles):
+                    mc[f"percentile_{p}"][mask] = amount[mask] * values[year_index]
+                mc["goal_probability"][mask] = probabilities
+            
+            def to_list(values):
+                # None (JSON null) for undefined cells; NaN is not valid JSON
+                return np.where(np.isfinite(values), values, None).tolist()
+            
+            results = {
+                'required_return_percent': to_list(required_return * 100),
+                'projected_nominal_value': to_list(nominal_value),
+                'projected_real_value': to_list(real_value),
+                'real_return_percent': to_list(real_return * 100)
+            }
+            results.update({key: to_list(values) for key, values in mc.items()})
+            with np.errstate(divide="ignore", invalid="ignore"):
+                results['real_percentile_5'] = to_list(mc["percentile_5"] / (1 + inflation) ** horizon)
+                results['real_percentile_95'] = to_list(mc["percentile_95"] / (1 + inflation) ** horizon)
+            
+            return {
+                'dimensions': dims,
+                'axes': {d: a.tolist() for d, a in zip(dims, axes)},
+                'num_simulations': num_paths,
+                'results': results,
+                'data_version': self.data_version
+            }
+            
+        except Exception as e:
+            return {'error': str(e)}
     
     def stress_test(self, weights):
         """Run stress test for portfolio"""
-        stress_impacts = {
-            "Fixed Deposits": 0.00,
-            "Government securities": 0.05,
-            "Equity": 0.30,
-            "Mutual Fund": 0.25,
-            "Real Estate": 0.20,
-            "Gold": 0.10
+        weight_vector = np.clip(self.universe.weights_vector(weights), 0, None)
+        return float(weight_vector @ self.universe.stress_impact) * 100
+    
+    @uses_snapshot
+    def stress_test_scenarios(self, weight_matrix, custom_scenarios=None):
+        """Drawdown (%) of every portfolio (rows of weight_matrix) under every library and custom scenario"""
+        scenarios = self.stress_scenarios
+        if custom_scenarios:
+            custom = pd.DataFrame.from_dict(custom_scenarios, orient="index")
+            custom = custom.reindex(columns=scenarios.columns).fillna(0.0).astype(float)
+            scenarios = pd.concat([scenarios[~scenarios.index.isin(custom.index)], custom])
+        drawdowns = np.atleast_2d(weight_matrix) @ scenarios.values.T * 100
+        return list(scenarios.index), drawdowns
+    
+    def summarize_stress(self, scenario_names, drawdowns):
+        """Per-scenario drawdowns and the worst case for a single portfolio"""
+        worst = int(np.argmax(drawdowns))
+        return {
+            'scenarios': {name: float(d) for name, d in zip(scenario_names, drawdowns)},
+            'worst_case': {'scenario': scenario_names[worst], 'drawdown_percent': float(drawdowns[worst])}
         }
-        
-        portfolio_drop_pct = 0
-        for avenue, weight in weights.items():
-            if weight > 0 and avenue in stress_impacts:
-                portfolio_drop_pct += weight * stress_impacts[avenue]
-        
-        return portfolio_drop_pct * 100
     
+    @uses_snapshot
     def optimize_portfolio(self, user_inputs):
         """Main portfolio optimization function"""
         try:
             # Validate inputs
             validated_inputs = self.validate_inputs(user_inputs)
             
+            # Serve repeated requests from the result cache
+            cache_key = canonical_hash(validated_inputs, self.data_version)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
             # Calculate required return
             required_return = self.calculate_required_return(validated_inputs)
             
             # Allocate assets
-            weights, selected_assets = self.allocate_assets(validated_inputs)
+            weights, selected_assets = self.allocate(validated_inputs)
             
             # Calculate portfolio metrics
             portfolio_cagr, tax_adj_cagr, real_return, volatility, beta = self.calculate_portfolio_metrics(weights, validated_inputs)
@@ -286,10 +1091,11 @@ class PortfolioOptimizer:
             nominal_value, real_value = self.project_growth(validated_inputs, portfolio_cagr, real_return)
             
             # Run Monte Carlo simulation
-            mean_value, p5, p95 = self.monte_carlo_simulation(validated_inputs, portfolio_cagr, volatility)
+            mc_results = self.run_monte_carlo(validated_inputs, portfolio_cagr, volatility, weights)
             
             # Run stress test
             crash_impact = self.stress_test(weights)
+            scenario_names, drawdowns = self.stress_test_scenarios(self.universe.weights_vector(weights))
             
             # Prepare results
             results = {
@@ -303,20 +1109,223 @@ class PortfolioOptimizer:
                 'portfolio_beta': beta if np.isfinite(beta) else None,
                 'projected_nominal_value': nominal_value if np.isfinite(nominal_value) else None,
                 'projected_real_value': real_value if np.isfinite(real_value) else None,
-                'monte_carlo_results': {
-                    'mean_value': mean_value if np.isfinite(mean_value) else None,
-                    'percentile_5': p5 if np.isfinite(p5) else None,
-                    'percentile_95': p95 if np.isfinite(p95) else None
-                },
+                'monte_carlo_results': self.format_monte_carlo_results(mc_results),
                 'stress_test_percent': crash_impact if np.isfinite(crash_impact) else None,
-                'recommendations': self.generate_recommendations(weights, portfolio_cagr, required_return)
+                'stress_scenarios': self.summarize_stress(scenario_names, drawdowns[0]),
+                'recommendations': self.generate_recommendations(weights, portfolio_cagr, required_return),
+                'data_version': self.data_version
             }
             
+            self.result_cache.set(cache_key, results)
             return results
             
         except Exception as e:
             return {'error': str(e)}
     
+    @uses_snapshot
+    def simulate_terminal_values(self, user_inputs):
+        """Simulated terminal values of the optimized portfolio as a float32 array, for binary export"""
+        validated_inputs = self.validate_inputs(user_inputs)
+        weights, _ = self.allocate(validated_inputs)
+        portfolio_cagr, _, _, volatility, _ = self.calculate_portfolio_metrics(weights, validated_inputs)
+        mc_results = self.run_monte_carlo(
+            dict(validated_inputs, histogram=False, fan_chart=False), portfolio_cagr, volatility, weights, keep_values=True
+        )
+        if "final_values" not in mc_results:
+            raise ValueError(
+                f"Terminal values can only be exported for simulations of up to {self.STREAMING_THRESHOLD:,} paths."
+            )
+        return np.asarray(mc_results["final_values"], dtype=np.float32)
+    
+    @uses_snapshot
+    def optimize_many(self, inputs_frame, sim_options=None):
+        """Optimize portfolios for many investor profiles at once, returning one result (or error) per row"""
+        frame = pd.DataFrame(inputs_frame).reset_index(drop=True)
+        self.simulation_count(sim_options or {})
+        required = ["total_savings", "monthly_expenses", "investment_amount", "investment_horizon",
+                    "risk_tolerance", "financial_goal", "investment_experience", "tax_bracket",
+                    "expected_inflation"]
+        missing = [col for col in required if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing input columns: {', '.join(missing)}")
+        
+        results = [None] * len(frame)
+        numeric = frame[["total_savings", "monthly_expenses", "investment_amount", "investment_horizon",
+                         "financial_goal", "tax_bracket", "expected_inflation"]].apply(pd.to_numeric, errors="coerce")
+        amount = numeric["investment_amount"].to_numpy(dtype=float)
+        goal = numeric["financial_goal"].to_numpy(dtype=float)
+        years = numeric["investment_horizon"].to_numpy(dtype=float)
+        
+        # Vectorized validation (same rules and order as validate_inputs)
+        emergency_fund = numeric["monthly_expenses"].to_numpy(dtype=float) * 6
+        investable_amount = numeric["total_savings"].to_numpy(dtype=float) - emergency_fund
+        invalid = numeric.isna().any(axis=1).to_numpy()
+        checks = [
+            (invalid, lambda i: "Invalid or missing numeric input."),
+            (investable_amount < 0, lambda i: f"Insufficient savings. Need at least 6 months of expenses (₹{emergency_fund[i]:,.2f}) as emergency fund."),
+            (amount > investable_amount, lambda i: f"Investment amount (₹{amount[i]:,.2f}) exceeds the available investable amount (₹{investable_amount[i]:,.2f}) after setting aside emergency fund."),
+            (amount <= 0, lambda i: "Investment amount must be positive."),
+            (goal <= amount, lambda i: "Financial goal must be greater than the investment amount."),
+            (years <= 0, lambda i: "Investment horizon must be at least 1 year."),
+            (years != np.floor(years), lambda i: "Investment horizon must be a whole number of years.")
+        ]
+        failed = np.zeros(len(frame), dtype=bool)
+        for mask, message in checks:
+            for i in np.flatnonzero(mask & ~failed):
+                results[i] = {"error": message(i)}
+            failed |= mask
+        
+        valid = np.flatnonzero(~failed)
+        if len(valid) == 0:
+            return results
+        rows = frame.iloc[valid].reset_index(drop=True)
+        amount, goal = amount[valid], goal[valid]
+        years = years[valid].astype(int)
+        inflation = numeric["expected_inflation"].to_numpy(dtype=float)[valid]
+        tax_bracket = numeric["tax_bracket"].to_numpy(dtype=float)[valid]
+        
+        # Required return
+        required_return = (goal / amount) ** (1 / years) - 1
+        
+        # Allocation: one lookup per distinct profile (rule table or frontier target)
+        sim_options = {k: v for k, v in (sim_options or {}).items() if v is not None}
+        default_method = sim_options.get("allocation_method") or "rules"
+        methods = rows["allocation_method"].fillna(default_method) if "allocation_method" in rows else [default_method] * len(rows)
+        profile_keys = []
+        profiles = {}
+        for i, (risk, experience, method) in enumerate(zip(rows["risk_tolerance"], rows["investment_experience"], methods)):
+            real_estate = bool(amount[i] >= self.MIN_REAL_ESTATE_INVESTMENT)
+            if method == "frontier":
+                key = ("frontier", risk, experience, real_estate, float(required_return[i]))
+            else:
+                key = ("rules", risk, experience, real_estate)
+            if key not in profiles:
+                profile_inputs = {
+                    "risk_tolerance": risk, "investment_experience": experience, "liquidity_needs": None,
+                    "investment_amount": amount[i], "financial_goal": goal[i], "investment_horizon": years[i]
+                }
+                if method == "frontier":
+                    weights, selected = self.allocate_assets_frontier(profile_inputs)
+                else:
+                    weights, selected = self.allocate_assets(dict(
+                        profile_inputs, investment_amount=self.MIN_REAL_ESTATE_INVESTMENT if real_estate else 0
+                    ))
+                profiles[key] = (self.universe.weights_vector(weights), selected)
+            profile_keys.append(key)
+        weight_matrix = np.array([profiles[key][0] for key in profile_keys], dtype=float)
+        
+        # Portfolio metrics as matrix products
+        metrics = self.universe.portfolio_metrics(weight_matrix, tax_bracket)
+        portfolio_cagr = metrics["cagr"]
+        portfolio_volatility = metrics["volatility"]
+        portfolio_beta = metrics["beta"]
+        tax_adj_cagr = metrics["tax_adj_cagr"]
+        real_return = tax_adj_cagr - inflation
+        
+        # Growth projection and stress test
+        nominal_value = np.where(portfolio_cagr <= -1, 0, amount * (1 + portfolio_cagr) ** years)
+        real_value = np.where(real_return <= -1, 0, amount * (1 + real_return) ** years)
+        crash_impact = metrics["stress_impact"] * 100
+        scenario_names, drawdowns = self.stress_test_scenarios(weight_matrix)
+        
+        # Monte Carlo: one run per distinct simulation key. Runs are on a unit
+        # amount and rescaled per row, except monthly runs, whose SIP
+        # contributions do not scale with the amount
+        mode = sim_options.get("simulation_mode")
+        unit_results = {}
+        scale = amount
+        if mode == "correlated":
+            for horizon in np.unique(years):
+                idx = np.flatnonzero(years == horizon)
+                unique_weights = {tuple(weight_matrix[i]) for i in idx}
+                unique_weights = sorted(unique_weights)
+                unit_inputs = dict(sim_options, investment_horizon=int(horizon), investment_amount=1)
+                final_values, path_drawdowns = self.correlated_monte_carlo(
+                    unit_inputs, [self.universe.weights_dict(w) for w in unique_weights]
+                )
+                for j, w in enumerate(unique_weights):
+                    unit_results[(w, int(horizon))] = self.attach_distribution(
+                        self.summarize_final_values(
+                            final_values[:, j], sim_options.get("percentiles") or [], 1, path_drawdowns[:, j]
+                        ),
+                        final_values[:, j], unit_inputs
+                    )
+            sim_keys = [(tuple(weight_matrix[i]), int(years[i])) for i in range(len(valid))]
+        elif mode in ("monthly", "bootstrap"):
+            monthly = mode == "monthly"
+            sim_keys = [
+                (tuple(weight_matrix[i]), int(years[i])) + ((float(amount[i]), float(goal[i])) if monthly else ())
+                for i in range(len(valid))
+            ]
+            for key in set(sim_keys):
+                weight_vector, horizon = key[:2]
+                run_amount, run_goal = key[2:] if monthly else (1, None)
+                unit_results[key] = self.run_monte_carlo(
+                    dict(sim_options, investment_horizon=horizon, investment_amount=run_amount, financial_goal=run_goal),
+                    np.nan, np.nan, self.universe.weights_dict(np.array(weight_vector))
+                )
+            if monthly:
+                scale = np.ones(len(valid))
+        else:
+            sim_keys = list(zip(portfolio_cagr, portfolio_volatility, years.tolist()))
+            for key in set(sim_keys):
+                sim_cagr, sim_vol, horizon = key
+                unit_results[key] = self.run_monte_carlo(
+                    dict(sim_options, investment_horizon=horizon, investment_amount=1), sim_cagr, sim_vol
+                )
+        
+        for i, row_index in enumerate(valid):
+            weights = self.universe.weights_dict(weight_matrix[i])
+            mc_results = self._scale_monte_carlo_results(unit_results[sim_keys[i]], scale[i])
+            results[row_index] = {
+                'required_return_percent': required_return[i] * 100 if np.isfinite(required_return[i]) else None,
+                'asset_allocation': {k: v * 100 for k, v in weights.items() if v > 0},
+                'selected_assets': profiles[profile_keys[i]][1],
+                'portfolio_cagr_percent': portfolio_cagr[i] * 100 if np.isfinite(portfolio_cagr[i]) else None,
+                'tax_adj_cagr_percent': tax_adj_cagr[i] * 100 if np.isfinite(tax_adj_cagr[i]) else None,
+                'real_return_percent': real_return[i] * 100 if np.isfinite(real_return[i]) else None,
+                'portfolio_volatility_percent': portfolio_volatility[i] * 100 if np.isfinite(portfolio_volatility[i]) else None,
+                'portfolio_beta': portfolio_beta[i] if np.isfinite(portfolio_beta[i]) else None,
+                'projected_nominal_value': nominal_value[i] if np.isfinite(nominal_value[i]) else None,
+                'projected_real_value': real_value[i] if np.isfinite(real_value[i]) else None,
+                'monte_carlo_results': self.format_monte_carlo_results(mc_results),
+                'stress_test_percent': crash_impact[i] if np.isfinite(crash_impact[i]) else None,
+                'stress_scenarios': self.summarize_stress(scenario_names, drawdowns[i]),
+                'recommendations': self.generate_recommendations(weights, portfolio_cagr[i], required_return[i]),
+                'data_version': self.data_version
+            }
+        
+        return results
+    
+    def _scale_monte_carlo_results(self, unit_results, amount):
+        """Rescale unit-amount Monte Carlo value statistics to an investment amount (drawdowns are scale-free)"""
+        scaled = {}
+        for key, value in unit_results.items():
+            if key in ("mean_value", "percentile_5", "percentile_95", "value_at_risk_95", "conditional_value_at_risk_95"):
+                scaled[key] = value * amount
+            elif key == "percentiles":
+                scaled[key] = {k: v * amount for k, v in value.items()}
+            elif key == "histogram":
+                # Bin edges (linear or geometric) scale with the values; counts do not change
+                scaled[key] = dict(value, bin_edges=[float(e * amount) for e in value["bin_edges"]])
+            else:
+                scaled[key] = value
+        return scaled
+    
+    def format_monte_carlo_results(self, mc_results):
+        """Replace non-finite Monte Carlo statistics with None for JSON output"""
+        formatted = {}
+        for key, value in mc_results.items():
+            if isinstance(value, dict):
+                formatted[key] = self.format_monte_carlo_results(value)
+            elif isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+                formatted[key] = value if np.isfinite(value) else None
+            elif isinstance(value, list):
+                formatted[key] = [v if not isinstance(v, float) or np.isfinite(v) else None for v in value]
+            else:
+                formatted[key] = value
+        return formatted
+    
     def generate_recommendations(self, weights, portfolio_cagr, required_return):
         """Generate personalized recommendations"""
         recommendations = []
@@ -0,0 +1,75 @@
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class PriceDownloader:
+    """Concurrent per-ticker history downloads with timeouts, retries and a deadline
+
+    fetch(ticker, start, end, timeout) must return a DataFrame of daily bars
+    and raise on transient failures; an empty frame is treated as a final
+    answer (e.g. a delisted ticker) and is not retried. Failed attempts are
+    retried with exponential backoff and jitter. download() returns whatever
+    finished before the deadline; unfinished tickers are reported, not waited for.
+    """
+
+    def __init__(self, fetch, max_workers=8, timeout=15, retries=2, backoff=0.5):
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def _fetch_with_retry(self, ticker, start, end, deadline):
+        attempt = 0
+        while True:
+            try:
+                return self.fetch(ticker, start, end, self.timeout)
+            except Exception:
+                delay = self.backoff * 2 ** attempt * (1 + random.random())
+                if attempt >= self.retries or (deadline is not None and time.monotonic() + delay >= deadline):
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    def download(self, tickers, start, end, deadline_seconds=None):
+        """Fetch all tickers concurrently
+
+        Returns (histories, report): histories maps ticker -> DataFrame for
+        every completed download, report lists the tickers that failed and
+        those still pending at the deadline, plus the elapsed time.
+        """
+        started = time.monotonic()
+        deadline = started + deadline_seconds if deadline_seconds else None
+        tickers = list(dict.fromkeys(tickers))
+        histories, failed = {}, {}
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(tickers), 1)))
+        try:
+            pending = {
+                executor.submit(self._fetch_with_retry, ticker, start, end, deadline): ticker
+                for ticker in tickers
+            }
+            while pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ticker = pending.pop(future)
+                    try:
+                        histories[ticker] = future.result()
+                    except Exception as e:
+                        failed[ticker] = str(e)
+        finally:
+            # Do not block the request on downloads that missed the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        report = {
+            'requested': len(tickers),
+            'completed': len(histories),
+            'failed': failed,
+            'timed_out': sorted(pending.values()) if pending else [],
+            'elapsed_seconds': time.monotonic() - started
+        }
+        return histories, report
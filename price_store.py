@@ -0,0 +1,185 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks (Windows): manifest updates are only serialized within a process
+    fcntl = None
+
+
+class PriceStore:
+    """Incremental on-disk cache of daily price history, one file per ticker
+
+    Files are Parquet when pyarrow is installed and CSV otherwise. A manifest
+    records the date range already requested for each ticker, so a read only
+    downloads the part of [start, end) not covered yet (normally just the
+    tail since the last run) and serves the rest from disk. In offline mode
+    the network is never used and reads return whatever is on disk, which
+    also lets fixture files stand in for live data.
+
+    history() has the same signature as the fetch function it wraps, so it
+    can be handed to PriceDownloader directly.
+
+    Several processes (e.g. the API and the analytics scheduler) may share a
+    root: files are replaced atomically through per-process temporary names,
+    and each manifest update re-reads the manifest on disk and changes only
+    its own ticker's entry under an exclusive file lock.
+    """
+
+    MANIFEST = "_manifest.json"
+    MANIFEST_LOCK = "_manifest.lock"
+
+    def __init__(self, root, fetch=None, offline=False):
+        self.root = root
+        self.fetch = fetch
+        self.offline = offline or fetch is None
+        self.extension = ".parquet" if PARQUET_AVAILABLE else ".csv"
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+        os.makedirs(root, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.root, self.MANIFEST), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _manifest_lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, self.MANIFEST_LOCK), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_coverage(self, ticker, coverage):
+        """Record one ticker's coverage, keeping entries other processes wrote since we loaded"""
+        path = os.path.join(self.root, self.MANIFEST)
+        with self._manifest_lock():
+            manifest = self._load_manifest()
+            manifest[ticker] = coverage
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, path)
+            self.manifest = manifest
+
+    def _refresh_coverage(self, ticker):
+        """Coverage of a ticker, preferring the manifest on disk (another process may have extended it)"""
+        coverage = self._load_manifest().get(ticker)
+        with self._lock:
+            if coverage is not None:
+                self.manifest[ticker] = coverage
+            return self.manifest.get(ticker)
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def path(self, ticker, extension=None):
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+        return os.path.join(self.root, safe_name + (extension or self.extension))
+
+    def read(self, ticker):
+        """Full cached history of a ticker (tz-naive DatetimeIndex), empty if not cached"""
+        for extension in (self.extension, ".csv", ".parquet"):
+            path = self.path(ticker, extension)
+            if not os.path.exists(path):
+                continue
+            if extension == ".parquet":
+                if not PARQUET_AVAILABLE:
+                    continue
+                frame = pd.read_parquet(path)
+            else:
+                frame = pd.read_csv(path, index_col=0, parse_dates=True)
+            frame.index = pd.DatetimeIndex(frame.index, name="Date")
+            return frame
+        return pd.DataFrame()
+
+    def _write(self, ticker, frame):
+        path = self.path(ticker)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if self.extension == ".parquet":
+            frame.to_parquet(tmp_path)
+        else:
+            frame.to_csv(tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _normalize(frame):
+        if frame is None or frame.empty:
+            return pd.DataFrame()
+        frame = frame.copy()
+        index = pd.DatetimeIndex(frame.index)
+        frame.index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+        frame.index.name = "Date"
+        return frame[~frame.index.duplicated(keep="last")].sort_index()
+
+    def last_cached_date(self, ticker):
+        coverage = self.manifest.get(ticker)
+        return coverage["last_date"] if coverage else None
+
+    def history(self, ticker, start_date, end_date, timeout=None):
+        """Daily bars for [start_date, end_date), downloading only what is not cached yet"""
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        with self._ticker_lock(ticker):
+            if not self.offline:
+                coverage = self._refresh_coverage(ticker)
+            cached = self.read(ticker)
+            if not self.offline:
+                cached = self._update(ticker, cached, coverage, start, end, timeout)
+        if cached.empty:
+            return cached
+        return cached[(cached.index >= start) & (cached.index < end)]
+
+    def _update(self, ticker, cached, coverage, start, end, timeout):
+        covered_start = pd.Timestamp(coverage["start"]) if coverage else None
+        covered_end = pd.Timestamp(coverage["end"]) if coverage else None
+
+        # Coverage comes from the manifest: a ticker with no bars (e.g. delisted) has
+        # no file but is still covered; only a lost file of a ticker with bars is refetched
+        lost_file = cached.empty and coverage is not None and coverage.get("last_date") is not None
+        if covered_start is None or start < covered_start or lost_file:
+            # Nothing usable on disk (or history needed before it): fetch the whole range
+            fetch_ranges = [(start, max(end, covered_end) if covered_end is not None else end)]
+        elif end > covered_end:
+            # Only the missing tail, restarting at the last cached bar to pick up late revisions
+            fetch_ranges = [(min(cached.index[-1], covered_end) if not cached.empty else covered_end, end)]
+        else:
+            return cached
+
+        frames = [cached]
+        for fetch_start, fetch_end in fetch_ranges:
+            frames.append(self._normalize(self.fetch(
+                ticker, fetch_start.strftime('%Y-%m-%d'), fetch_end.strftime('%Y-%m-%d'), timeout
+            )))
+        frames = [f for f in frames if not f.empty]
+        merged = self._normalize(pd.concat(frames)) if frames else pd.DataFrame()
+        if not merged.empty:
+            self._write(ticker, merged)
+
+        self._save_coverage(ticker, {
+            "start": min(start, covered_start or start).strftime('%Y-%m-%d'),
+            "end": max(end, covered_end or end).strftime('%Y-%m-%d'),
+            "last_date": merged.index[-1].strftime('%Y-%m-%d') if not merged.empty else None
+        })
+        return merged
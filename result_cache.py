@@ -0,0 +1,209 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def canonical_hash(*parts):
+    """Stable hash of JSON-like values, insensitive to key order and int/float spelling"""
+    def canonical(value):
+        if isinstance(value, dict):
+            return {str(k): canonical(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [canonical(v) for v in value]
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, (int, float)):
+            # 10, 10.0 and 10.000000000001 map to the same key
+            return float(f"{float(value):.10g}")
+        if isinstance(value, str):
+            return value
+        if hasattr(value, "item"):
+            return canonical(value.item())
+        return str(value)
+
+    payload = json.dumps([canonical(p) for p in parts], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU cache with TTL expiry and an approximate memory ceiling"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return a copy of the cached value, or None on miss/expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        """Store a copy of value, evicting least recently used entries as needed"""
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl_seconds)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'approx_bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else None
+            }
+
+
+class StaleWhileRevalidateCache:
+    """Single-flight cache that serves stale values while one background refresh runs
+
+    Each entry remembers the data version it was computed against. A lookup
+    with the same version within ttl_seconds is a fresh hit. An entry that has
+    expired or belongs to another version is returned immediately, and a single
+    background refresh per key replaces it. A miss computes in the calling
+    thread; concurrent misses for the same key wait for that computation
+    instead of starting their own. A value that compute marks as incomplete
+    is stored already stale: it is served, but the next lookup refreshes it.
+    Values are shared, not copied, and must be treated as read-only.
+    """
+
+    def __init__(self, ttl_seconds=900, max_entries=64):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, version, computed_at, complete)
+        self._inflight = {}  # key -> Future of the new entry
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def get(self, key, version, compute, complete=None):
+        """Return (value, info) for key, calling compute() at most once at a time per key
+
+        info reports how the value was served ('fresh', 'stale', 'miss' or
+        'coalesced'), the data version it was computed against, its age and
+        whether it is complete (complete(value), default True). Exceptions
+        from a foreground computation propagate to every waiter; a failed
+        background refresh keeps the stale value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry[3] and entry[1] == version and time.time() - entry[2] < self.ttl_seconds:
+                    self.hits += 1
+                    return entry[0], self._info('fresh', entry)
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            if entry is not None:
+                self.stale_hits += 1
+            elif leader:
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if entry is not None:
+            if leader:
+                threading.Thread(
+                    target=self._compute, args=(key, version, compute, complete, future, True),
+                    name="cache-refresh", daemon=True
+                ).start()
+            return entry[0], self._info('stale', entry)
+        if leader:
+            self._compute(key, version, compute, complete, future, False)
+        result = future.result()
+        return result[0], self._info('miss' if leader else 'coalesced', result)
+
+    def _compute(self, key, version, compute, complete, future, background):
+        try:
+            value = compute()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.errors += 1
+            if background:
+                print(f"⚠️ Background cache refresh failed, keeping the stale value: {e}")
+            future.set_exception(e)
+            return
+        entry = (value, version, time.time(), complete is None or bool(complete(value)))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(entry)
+
+    @staticmethod
+    def _info(status, entry):
+        return {
+            'status': status,
+            'data_version': entry[1],
+            'computed_at': entry[2],
+            'age_seconds': max(time.time() - entry[2], 0.0),
+            'complete': entry[3]
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'refreshing': len(self._inflight),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'hit_rate': (self.hits + self.stale_hits) / lookups if lookups else None
+            }
@@ -0,0 +1,178 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from result_cache import canonical_hash
+
+
+def _to_json(value):
+    return json.dumps(value, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+
+
+class PlanStore:
+    """SQLite table of saved plans, one row per (user, kind)
+
+    Each row keeps the inputs, their canonical hash, the seed, the data
+    version the outputs were computed against and the outputs themselves,
+    so serving a fresh plan is a single primary-key read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plans (
+                    user TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    inputs TEXT NOT NULL,
+                    inputs_hash TEXT NOT NULL,
+                    seed INTEGER,
+                    data_version TEXT,
+                    outputs TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (user, kind)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS plans_kind_version ON plans (kind, data_version)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_plan(row):
+        plan = dict(row)
+        plan["inputs"] = json.loads(plan["inputs"])
+        plan["outputs"] = json.loads(plan["outputs"])
+        return plan
+
+    def get(self, user, kind):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM plans WHERE user = ? AND kind = ?", (user, kind)).fetchone()
+        return self._row_to_plan(row) if row else None
+
+    def get_user_plans(self, user):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM plans WHERE user = ? ORDER BY kind", (user,)).fetchall()
+        return [self._row_to_plan(row) for row in rows]
+
+    def stale(self, kind, data_version):
+        """Plans of a kind computed against any other data version"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM plans WHERE kind = ? AND data_version IS NOT ?", (kind, data_version)
+            ).fetchall()
+        return [self._row_to_plan(row) for row in rows]
+
+    def save(self, user, kind, inputs, inputs_hash, seed, data_version, outputs):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (user, kind, _to_json(inputs), inputs_hash, seed, data_version, _to_json(outputs), time.time())
+            )
+
+    def delete(self, user, kind):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM plans WHERE user = ? AND kind = ?", (user, kind)).rowcount > 0
+
+
+class SavedPlans:
+    """Per-user saved plans that are only recomputed when they are dirty
+
+    Plan kinds are registered with a compute function (inputs -> outputs
+    dict, raising ValueError for invalid inputs) and optionally a function
+    returning the current data version. A plan is dirty when its inputs
+    hash or data version differs from the current one; dirty plans are
+    recomputed on read, and refresh_stale() recomputes them in bulk.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.kinds = {}
+        self._refresh_requested = threading.Event()
+        self._worker = None
+        self.last_refresh = None
+
+    def register(self, kind, compute, data_version=None, seeded=False):
+        """Add a plan kind; seeded kinds get a fixed random seed stored with the plan"""
+        self.kinds[kind] = {"compute": compute, "data_version": data_version or (lambda: None), "seeded": seeded}
+
+    def _kind(self, kind):
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown plan type '{kind}'. Use one of: {', '.join(self.kinds)}.")
+        return self.kinds[kind]
+
+    def _compute(self, user, kind, inputs, seed):
+        spec = self._kind(kind)
+        data_version = spec["data_version"]()
+        run_inputs = dict(inputs, seed=seed) if spec["seeded"] else inputs
+        outputs = spec["compute"](run_inputs)
+        self.store.save(user, kind, inputs, canonical_hash(inputs), seed, data_version, outputs)
+        return self.store.get(user, kind)
+
+    def save_plan(self, user, kind, inputs):
+        """Store a plan, recomputing only if the inputs or data version changed"""
+        spec = self._kind(kind)
+        plan = self.store.get(user, kind)
+        if plan and plan["inputs_hash"] == canonical_hash(inputs) and plan["data_version"] == spec["data_version"]():
+            return plan
+        seed = None
+        if spec["seeded"]:
+            seed = inputs.get("seed")
+            if seed is None:
+                seed = plan["seed"] if plan and plan["seed"] is not None else random.randrange(2 ** 31)
+        return self._compute(user, kind, inputs, seed)
+
+    def get_plan(self, user, kind):
+        """Saved plan, recomputed first if the data it was computed on has changed"""
+        plan = self.store.get(user, kind)
+        if plan is None:
+            return None
+        if plan["data_version"] != self._kind(kind)["data_version"]():
+            plan = self._compute(user, kind, plan["inputs"], plan["seed"])
+        return plan
+
+    def get_user_plans(self, user):
+        plans = self.store.get_user_plans(user)
+        return [
+            self.get_plan(user, plan["kind"])
+            if plan["kind"] in self.kinds and plan["data_version"] != self.kinds[plan["kind"]]["data_version"]()
+            else plan
+            for plan in plans
+        ]
+
+    def refresh_stale(self):
+        """Recompute every plan whose data version is out of date; returns the count"""
+        refreshed = 0
+        for kind, spec in self.kinds.items():
+            for plan in self.store.stale(kind, spec["data_version"]()):
+                try:
+                    self._compute(plan["user"], kind, plan["inputs"], plan["seed"])
+                    refreshed += 1
+                except Exception as e:
+                    print(f"⚠️ Could not refresh {kind} plan for {plan['user']}: {e}")
+        self.last_refresh = {"time": time.time(), "refreshed": refreshed}
+        return refreshed
+
+    def request_refresh(self, *args):
+        """Ask the background worker to refresh stale plans (reloads in quick succession coalesce)"""
+        self._refresh_requested.set()
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="saved-plan-refresh", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._refresh_requested.wait()
+            self._refresh_requested.clear()
+            self.refresh_stale()
@@ -0,0 +1,245 @@
+import numpy as np
+
+
+def max_drawdowns(path_values, initial_value):
+    """Largest peak-to-trough fall (fraction) of each path of year-end values"""
+    path_values = np.asarray(path_values, dtype=float)
+    running_peak = np.maximum.accumulate(path_values, axis=1)
+    np.maximum(running_peak, initial_value, out=running_peak)
+    return np.max(1 - path_values / running_peak, axis=1).clip(min=0)
+
+
+class RunningMoments:
+    """Running count, mean, variance, min and max over streamed chunks"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Fold a chunk of values into the running moments (Chan et al. merge)"""
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        chunk_mean = values.mean()
+        chunk_m2 = np.sum((values - chunk_mean) ** 2)
+        self._combine(values.size, chunk_mean, chunk_m2, values.min(), values.max())
+
+    def merge(self, other):
+        """Merge another RunningMoments into this one"""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch with a relative-error guarantee (DDSketch)
+
+    Every positive value x is counted in bucket i = ceil(log_gamma(x)) with
+    gamma = (1 + alpha) / (1 - alpha), and bucket i is reported as
+    2 * gamma**i / (gamma + 1). For any q, quantile(q) is within a relative
+    error alpha of the exact order statistic x_(k), k = floor(q * (n - 1)),
+    i.e. |estimate - x_(k)| <= alpha * x_(k). np.percentile interpolates
+    between x_(k) and x_(k+1), so the gap to it is at most alpha plus the
+    spacing of adjacent order statistics, which vanishes as n grows.
+
+    Memory is fixed at max_buckets counters. If the observed range needs more
+    buckets, the lowest ones are collapsed together; the bound then no longer
+    holds for quantiles falling inside the collapsed range. With the defaults
+    (alpha=0.005, 2048 buckets) this needs values spanning a factor of about
+    e^20, far wider than any simulated terminal value distribution.
+    Values <= min_value (including zero and negatives) are counted as zero.
+    """
+
+    def __init__(self, alpha=0.005, max_buckets=2048, min_value=1e-9):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = np.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.offset = 0
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, values):
+        """Add a chunk of values to the sketch"""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        self.count += values.size
+
+        positive = values[values > self.min_value]
+        self.zero_count += values.size - positive.size
+        if positive.size == 0:
+            return
+
+        indices = np.ceil(np.log(positive) / self.log_gamma).astype(np.int64)
+        self._add_counts(indices.min(), np.bincount(indices - indices.min()))
+
+    def merge(self, other):
+        """Merge another sketch built with the same alpha"""
+        if other.alpha != self.alpha:
+            raise ValueError("Cannot merge sketches with different accuracy.")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        if other.counts.size:
+            self._add_counts(other.offset, other.counts)
+
+    def _add_counts(self, offset, counts):
+        if self.counts.size == 0:
+            self.offset, self.counts = offset, counts.astype(np.int64)
+        else:
+            low = min(self.offset, offset)
+            high = max(self.offset + self.counts.size, offset + counts.size)
+            merged = np.zeros(high - low, dtype=np.int64)
+            merged[self.offset - low:self.offset - low + self.counts.size] += self.counts
+            merged[offset - low:offset - low + counts.size] += counts
+            self.offset, self.counts = low, merged
+
+        # Keep memory bounded by collapsing the lowest buckets
+        excess = self.counts.size - self.max_buckets
+        if excess > 0:
+            self.counts[excess] += self.counts[:excess].sum()
+            self.counts = self.counts[excess:].copy()
+            self.offset += excess
+
+    def quantile(self, q):
+        """Estimate the q-th quantile (0 <= q <= 1)"""
+        if self.count == 0:
+            return np.nan
+        rank = int(np.floor(q * (self.count - 1)))
+        if rank < self.zero_count:
+            return 0.0
+        cumulative = np.cumsum(self.counts)
+        bucket = int(np.searchsorted(cumulative, rank - self.zero_count, side="right"))
+        return 2 * self.gamma ** (self.offset + bucket) / (self.gamma + 1)
+
+    def weighted_values(self):
+        """Representative value and count of every non-empty bucket (zeros first, if any)"""
+        values = 2 * self.gamma ** (self.offset + np.arange(self.counts.size)) / (self.gamma + 1)
+        nonzero = self.counts > 0
+        values, counts = values[nonzero], self.counts[nonzero]
+        if self.zero_count:
+            values, counts = np.concatenate([[0.0], values]), np.concatenate([[self.zero_count], counts])
+        return values, counts
+
+    def fraction_at_least(self, x):
+        """Estimate the fraction of values >= x, resolved to the bucket containing x"""
+        if self.count == 0:
+            return np.nan
+        values = 2 * self.gamma ** (self.offset + np.arange(self.counts.size)) / (self.gamma + 1)
+        at_least = self.counts[values >= x].sum() + (self.zero_count if x <= 0 else 0)
+        return at_least / self.count
+
+    def tail_mean(self, q):
+        """Estimate the mean of the values at or below the q-th quantile (same relative bound)"""
+        if self.count == 0:
+            return np.nan
+        tail_count = max(1, int(np.floor(q * self.count)))
+        if tail_count <= self.zero_count:
+            return 0.0
+        values = 2 * self.gamma ** (self.offset + np.arange(self.counts.size)) / (self.gamma + 1)
+        # Take whole buckets up to the quantile and part of the bucket containing it
+        remaining = np.clip(tail_count - self.zero_count - np.concatenate([[0], np.cumsum(self.counts)[:-1]]),
+                            0, self.counts)
+        return float(np.sum(remaining * values) / tail_count)
+
+
+class StreamingSummary:
+    """Fixed-memory mean / variance / quantile aggregator for simulated values"""
+
+    def __init__(self, alpha=0.005, max_buckets=2048):
+        self.moments = RunningMoments()
+        self.sketch = QuantileSketch(alpha, max_buckets)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        self.moments.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    @property
+    def mean(self):
+        return self.moments.mean if self.moments.count else np.nan
+
+    def percentile(self, p):
+        """Estimate the p-th percentile (0 <= p <= 100)"""
+        return self.sketch.quantile(p / 100)
+
+    def tail_mean(self, p):
+        """Estimate the mean of values at or below the p-th percentile"""
+        return self.sketch.tail_mean(p / 100)
+
+    def fraction_at_least(self, x):
+        """Estimate the fraction of values >= x"""
+        return self.sketch.fraction_at_least(x)
+
+
+class PathSummary:
+    """Per-year streaming summaries and goal-attainment counts over simulated paths"""
+
+    def __init__(self, years, goal=None, initial_value=None, alpha=0.005, max_buckets=2048):
+        self.years = years
+        self.goal = goal
+        self.initial_value = initial_value
+        self.yearly = [StreamingSummary(alpha, max_buckets) for _ in range(years)]
+        self.goal_hits = np.zeros(years, dtype=np.int64)
+        # Per-path maximum drawdown, tracked when the starting value is known
+        self.drawdowns = StreamingSummary(alpha, max_buckets)
+        self.count = 0
+
+    def update(self, path_values):
+        """Fold a (paths, years) matrix of year-end values into the summary"""
+        path_values = np.asarray(path_values, dtype=float)
+        for year in range(self.years):
+            self.yearly[year].update(path_values[:, year])
+        if self.goal is not None:
+            self.goal_hits += np.count_nonzero(path_values >= self.goal, axis=0)
+        if self.initial_value is not None:
+            self.drawdowns.update(max_drawdowns(path_values, self.initial_value))
+        self.count += path_values.shape[0]
+
+    def merge(self, other):
+        for mine, theirs in zip(self.yearly, other.yearly):
+            mine.merge(theirs)
+        self.drawdowns.merge(other.drawdowns)
+        self.goal_hits += other.goal_hits
+        self.count += other.count
+
+    def means(self):
+        return np.array([summary.mean for summary in self.yearly])
+
+    def percentiles(self, p):
+        return np.array([summary.percentile(p) for summary in self.yearly])
+
+    def goal_probability(self):
+        return self.goal_hits / self.count if self.count else np.full(self.years, np.nan)
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portfolio_optimizer import PortfolioOptimizer  # noqa: E402
+
+BASE_INPUTS = {
+    "age": 30,
+    "annual_income": 1000000,
+    "total_savings": 750000,
+    "monthly_expenses": 30000,
+    "investment_amount": 500000,
+    "investment_horizon": 10,
+    "risk_tolerance": "moderate",
+    "financial_goal": 1000000,
+    "investment_experience": "intermediate",
+    "liquidity_needs": "moderate",
+    "tax_bracket": 0.125,
+    "expected_inflation": 0.06
+}
+
+
+@pytest.fixture(scope="session")
+def optimizer():
+    return PortfolioOptimizer()
+
+
+@pytest.fixture
+def base_inputs():
+    return dict(BASE_INPUTS)
+
+
+@pytest.fixture(scope="session")
+def backend_app(tmp_path_factory):
+    """The Flask API module, with its databases and caches in a temporary directory"""
+    pytest.importorskip("flask")
+    root = tmp_path_factory.mktemp("backend")
+    os.environ.update({
+        "PLANS_DB": str(root / "saved_plans.db"),
+        "ANALYTICS_SNAPSHOT_DIR": str(root / "analytics_snapshots"),
+        "EQUITY_PRICE_CACHE_DIR": str(root / "price_cache"),
+        "PORTFOLIO_DATA_WATCH": "0"
+    })
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+    import app
+    return app
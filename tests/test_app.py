@@ -0,0 +1,43 @@
+import pytest
+
+CSV_ROWS = "investment_amount,investment_horizon\n500000,10\n400000,10.5\n"
+
+
+def test_parse_simulation_options_converts_strings(backend_app):
+    options = backend_app.parse_simulation_options(backend_app.build_simulation_options({
+        "seed": "3", "percentiles": "25, 75", "tolerance": "0.01", "control_variate": "false",
+        "histogram": "1", "histogram_bins": "", "simulation_mode": "blended"
+    }))
+    assert options["seed"] == 3
+    assert options["percentiles"] == [25.0, 75.0]
+    assert options["tolerance"] == 0.01
+    assert options["control_variate"] is False
+    assert options["histogram"] is True
+    assert options["histogram_bins"] is None
+    assert options["simulation_mode"] == "blended"
+
+
+def test_parse_simulation_options_keeps_json_values(backend_app):
+    options = {"percentiles": [10], "histogram": False, "seed": 7}
+    assert backend_app.parse_simulation_options(options) == options
+
+
+@pytest.mark.parametrize("query", ["histogram=maybe", "percentiles=a", "seed=1.5", "tolerance=low"])
+def test_batch_rejects_unparseable_options(backend_app, query):
+    response = backend_app.app.test_client().post(
+        f"/api/portfolio/optimize-batch?{query}", data=CSV_ROWS, content_type="text/csv"
+    )
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_batch_csv_options_are_typed(backend_app):
+    response = backend_app.app.test_client().post(
+        "/api/portfolio/optimize-batch?seed=3&percentiles=25&histogram=false&control_variate=false",
+        data=CSV_ROWS, content_type="text/csv"
+    )
+    assert response.status_code == 200
+    first, second = response.get_json()["results"]
+    assert set(first["monte_carlo_results"]["percentiles"]) == {"p25"}
+    assert "histogram" not in first["monte_carlo_results"]
+    assert second["error"] == "Investment horizon must be a whole number of years."
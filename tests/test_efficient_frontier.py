@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+
+from efficient_frontier import EfficientFrontier
+
+ASSETS = ["Bonds", "Gold", "Equity", "Real Estate"]
+MEANS = np.array([0.07, 0.09, 0.13, 0.11])
+VOLATILITIES = np.array([0.05, 0.15, 0.20, 0.12])
+CORRELATION = np.array([
+    [1.0, 0.1, 0.2, 0.1],
+    [0.1, 1.0, -0.1, 0.2],
+    [0.2, -0.1, 1.0, 0.3],
+    [0.1, 0.2, 0.3, 1.0]
+])
+COVARIANCE = CORRELATION * np.outer(VOLATILITIES, VOLATILITIES)
+
+
+@pytest.fixture(scope="module")
+def frontier():
+    return EfficientFrontier(ASSETS, MEANS, COVARIANCE, num_points=41)
+
+
+def test_grid_is_sorted_and_long_only(frontier):
+    assert np.all(np.diff(frontier.returns) >= -1e-9)
+    assert np.all(np.diff(frontier.volatilities) >= 0)
+    assert np.all(frontier.weights >= 0)
+    np.testing.assert_allclose(frontier.weights.sum(axis=1), 1)
+
+
+def test_grid_points_return_their_own_weights(frontier):
+    for k in (0, 10, 25, 40):
+        np.testing.assert_allclose(frontier.weights_for_return(frontier.returns[k]), frontier.weights[k], atol=1e-12)
+
+
+def test_between_grid_points_weights_are_interpolated_linearly(frontier):
+    k = 12
+    target = 0.25 * frontier.returns[k] + 0.75 * frontier.returns[k + 1]
+    expected = 0.25 * frontier.weights[k] + 0.75 * frontier.weights[k + 1]
+    np.testing.assert_allclose(frontier.weights_for_return(target), expected, atol=1e-9)
+    np.testing.assert_allclose(frontier.weights_for_return(target) @ MEANS, target, atol=1e-6)
+
+
+def test_targets_outside_the_frontier_are_clamped(frontier):
+    np.testing.assert_allclose(frontier.weights_for_return(-1.0), frontier.weights[0])
+    np.testing.assert_allclose(frontier.weights_for_return(1.0), frontier.weights[-1])
+    np.testing.assert_allclose(frontier.weights_for_volatility(10.0), frontier.weights[-1])
+
+
+def test_many_targets_match_single_lookups(frontier):
+    targets = np.linspace(0.08, 0.12, 7)
+    batch = frontier.weights_for_return(targets)
+    assert batch.shape == (len(targets), len(ASSETS))
+    for target, weights in zip(targets, batch):
+        np.testing.assert_allclose(weights, frontier.weights_for_return(target))
+
+
+def test_interpolated_portfolio_is_close_to_the_solved_optimum(frontier):
+    target = 0.105
+    weights = frontier.weights_for_return(target)
+    solved = minimize(
+        lambda w: w @ COVARIANCE @ w, np.full(len(ASSETS), 0.25), bounds=[(0, 1)] * len(ASSETS),
+        constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1}, {"type": "eq", "fun": lambda w: w @ MEANS - target}],
+        method="SLSQP"
+    ).x
+    interpolated_volatility = np.sqrt(weights @ COVARIANCE @ weights)
+    assert interpolated_volatility == pytest.approx(np.sqrt(solved @ COVARIANCE @ solved), rel=1e-3)
+    assert frontier.volatility_for_return(target) == pytest.approx(interpolated_volatility, rel=1e-3)
+
+
+def test_excluded_assets_get_no_weight():
+    frontier = EfficientFrontier(ASSETS, MEANS, COVARIANCE, excluded=["Real Estate"], num_points=21)
+    assert np.all(frontier.weights[:, ASSETS.index("Real Estate")] == 0)
+    assert np.all(frontier.weights_for_return(np.linspace(0.07, 0.13, 5))[:, ASSETS.index("Real Estate")] == 0)
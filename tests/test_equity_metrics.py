@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from equity_metrics import cross_sectional_metrics, group_metrics, wide_matrix
+
+RISK_FREE_RATE, MARKET_RISK_PREMIUM, TAX_RATE, INFLATION_RATE = 0.07, 0.06, 0.1, 0.05
+NUMERIC_COLUMNS = ['CAGR', 'Volatility', 'Sharpe_Ratio', 'Beta', 'CAPM_Expected_Return', 'Real_Return', 'Liquidity']
+
+
+def per_ticker_metrics(hist, market_daily_returns):
+    """The per-ticker computation cross_sectional_metrics replaced, kept as the reference"""
+    if hist is None or hist.empty or len(hist) < 252:
+        return None
+    start_price, end_price = hist['Close'].iloc[0], hist['Close'].iloc[-1]
+    years = (hist.index[-1] - hist.index[0]).days / 365.25
+    cagr = (end_price / start_price) ** (1.0 / years) - 1
+    daily_returns = hist['Close'].pct_change().dropna()
+    if len(daily_returns) < 100:
+        return None
+    volatility = daily_returns.std() * np.sqrt(252)
+    sharpe_ratio = (cagr - RISK_FREE_RATE) / volatility if volatility != 0 else np.nan
+    aligned_returns = pd.concat([daily_returns, market_daily_returns], axis=1, sort=True).dropna()
+    if len(aligned_returns) < 50:
+        return None
+    stock_returns, market_returns = aligned_returns.iloc[:, 0], aligned_returns.iloc[:, 1]
+    market_var = market_returns.var()
+    beta = stock_returns.cov(market_returns) / market_var if market_var != 0 else np.nan
+    return {
+        'CAGR': cagr,
+        'Volatility': volatility,
+        'Sharpe_Ratio': sharpe_ratio,
+        'Beta': beta,
+        'CAPM_Expected_Return': RISK_FREE_RATE + beta * MARKET_RISK_PREMIUM if not np.isnan(beta) else np.nan,
+        'Real_Return': cagr * (1 - TAX_RATE) - INFLATION_RATE,
+        'Liquidity': hist['Volume'].mean(),
+        'Risk_Level': 'Low' if volatility < 0.20 else 'Medium' if volatility < 0.30 else 'High'
+    }
+
+
+def price_history(rng, dates, market_returns, beta, volatility):
+    returns = beta * market_returns[:len(dates)] + rng.normal(0.0003, volatility / np.sqrt(252), len(dates))
+    return pd.DataFrame({
+        'Close': 100 * np.cumprod(1 + returns),
+        'Volume': rng.integers(10000, 500000, len(dates)).astype(float)
+    }, index=dates)
+
+
+@pytest.fixture(scope="module")
+def universe():
+    rng = np.random.default_rng(11)
+    dates = pd.bdate_range('2022-01-03', '2023-12-29')
+    market_returns = rng.normal(0.0004, 0.01, len(dates) + 10)
+    market = pd.Series(1000 * np.cumprod(1 + market_returns[:len(dates)]), index=dates)
+
+    histories = {
+        'FULL.NS': price_history(rng, dates, market_returns, 1.1, 0.18),
+        'LATE.NS': price_history(rng, dates[220:], market_returns, 0.8, 0.25),
+        'DEFENSIVE.NS': price_history(rng, dates, market_returns, 0.3, 0.10),
+        'VOLATILE.NS': price_history(rng, dates, market_returns, 1.6, 0.45),
+        'SHORT.NS': price_history(rng, dates[-200:], market_returns, 1.0, 0.2)
+    }
+    # Missing bars, and bars on dates the index did not trade
+    gappy = price_history(rng, dates, market_returns, 1.2, 0.3)
+    histories['GAPPY.NS'] = gappy[rng.random(len(gappy)) > 0.15]
+    extra_dates = pd.DatetimeIndex(['2022-06-04', '2023-03-11', '2023-09-16'])
+    extra = pd.DataFrame({'Close': [101.0, 99.0, 120.0], 'Volume': [1000.0, 2000.0, 3000.0]}, index=extra_dates)
+    histories['WEEKEND.NS'] = pd.concat([price_history(rng, dates, market_returns, 0.9, 0.2), extra]).sort_index()
+    return histories, market
+
+
+@pytest.fixture(scope="module")
+def vectorized(universe):
+    histories, market = universe
+    return cross_sectional_metrics(
+        wide_matrix(histories, 'Close'), wide_matrix(histories, 'Volume'), market,
+        RISK_FREE_RATE, MARKET_RISK_PREMIUM, TAX_RATE, INFLATION_RATE
+    )
+
+
+def test_matches_per_ticker_computation(universe, vectorized):
+    histories, market = universe
+    market_daily_returns = market.pct_change().dropna()
+    expected = {
+        ticker: metrics for ticker, hist in histories.items()
+        if (metrics := per_ticker_metrics(hist, market_daily_returns)) is not None
+    }
+    assert sorted(vectorized.index) == sorted(expected)
+    assert 'SHORT.NS' not in vectorized.index
+    for ticker, metrics in expected.items():
+        row = vectorized.loc[ticker]
+        for column in NUMERIC_COLUMNS:
+            assert row[column] == pytest.approx(metrics[column], rel=1e-10), (ticker, column)
+        assert row['Risk_Level'] == metrics['Risk_Level']
+
+
+def test_group_metrics_matches_groupby(vectorized):
+    frame = vectorized.reset_index(names='Ticker')
+    frame['Sector'] = ['Banks', 'IT', 'Banks', 'IT', 'Banks', 'Pharma'][:len(frame)]
+    frame['Cap'] = ['Large', 'Large', 'Mid', 'Large', 'Large', 'Mid'][:len(frame)]
+    frame.loc[0, 'Beta'] = np.nan
+
+    expected = frame.groupby(['Sector', 'Cap']).agg({
+        **{column: 'mean' for column in NUMERIC_COLUMNS},
+        'Risk_Level': lambda x: x.mode()[0]
+    }).reset_index()
+    actual = group_metrics(frame, {'Sector': frame['Sector'], 'Cap': frame['Cap']}, NUMERIC_COLUMNS, 'Risk_Level')
+
+    assert list(actual['Sector']) == list(expected['Sector'])
+    assert list(actual['Cap']) == list(expected['Cap'])
+    assert list(actual['Risk_Level']) == list(expected['Risk_Level'])
+    np.testing.assert_allclose(actual[NUMERIC_COLUMNS].to_numpy(float), expected[NUMERIC_COLUMNS].to_numpy(float),
+                               rtol=1e-12)
+
+
+def test_mode_ties_go_to_the_smallest_label():
+    metrics = pd.DataFrame({'CAGR': [0.1, 0.2, 0.3, 0.4], 'Risk_Level': ['Medium', 'High', 'High', 'Medium']})
+    grouped = group_metrics(metrics, {'Sector': ['A'] * 4}, ['CAGR'], 'Risk_Level')
+    assert grouped['Risk_Level'].tolist() == ['High']
+    assert grouped['CAGR'].tolist() == pytest.approx([0.25])
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from monte_carlo_engine import MonteCarloEngine
+
+
+def make_engine(executor, workers):
+    engine = MonteCarloEngine(num_simulations=5000, workers=workers, executor=executor)
+    # Small shards and batches so every run spans several of them
+    engine.shard_size = 1000
+    engine.batch_size = 500
+    return engine
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+@pytest.mark.parametrize("collect", ["values", "risk_values", "paths"])
+def test_parallel_final_values_identical_for_any_worker_count(executor, collect):
+    outputs = [
+        make_engine(executor, workers).parallel_final_values(100000, 0.10, 0.18, 10, seed=42, collect=collect)
+        for workers in (1, 2, 4)
+    ]
+    for output in outputs[1:]:
+        for expected, actual in zip(np.atleast_1d(outputs[0]), np.atleast_1d(output)):
+            np.testing.assert_array_equal(expected, actual)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_summary_identical_for_any_worker_count(executor):
+    summaries = [
+        make_engine(executor, workers).parallel_final_values(100000, 0.10, 0.18, 10, seed=7, collect="summary")
+        for workers in (1, 2, 4)
+    ]
+    for summary in summaries[1:]:
+        assert summary.count == summaries[0].count
+        assert summary.mean == summaries[0].mean
+        assert [summary.percentile(p) for p in (5, 50, 95)] == [summaries[0].percentile(p) for p in (5, 50, 95)]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+@pytest.mark.parametrize("method", ["antithetic", "sobol"])
+def test_adaptive_final_values_identical_for_any_worker_count(executor, method):
+    results = [
+        make_engine(executor, workers).adaptive_final_values(
+            100000, 0.10, 0.18, 10, method=method, control_mean=100000 * 1.1 ** 10,
+            tolerance=0.01, max_paths=20000, seed=3
+        )
+        for workers in (1, 2, 4)
+    ]
+    for result in results[1:]:
+        assert result["num_simulations"] == results[0]["num_simulations"]
+        np.testing.assert_array_equal(result["final_values"], results[0]["final_values"])
+        np.testing.assert_array_equal(result["drawdowns"], results[0]["drawdowns"])
+        assert result["mean_value"] == results[0]["mean_value"]
+        assert result["mean_rel_error"] == results[0]["mean_rel_error"]
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from conftest import BASE_INPUTS
+
+ROWS = [
+    BASE_INPUTS,
+    dict(BASE_INPUTS, investment_amount=300000, risk_tolerance="aggressive", investment_experience="advanced"),
+    dict(BASE_INPUTS, total_savings=3000000, investment_amount=1500000, financial_goal=4000000,
+         allocation_method="frontier"),
+    dict(BASE_INPUTS, allocation_method="frontier", risk_tolerance="conservative")
+]
+
+
+@pytest.mark.parametrize("num_simulations", [-5, 0, 2.5, "many", 10 ** 9])
+def test_invalid_simulation_counts_are_rejected(optimizer, base_inputs, num_simulations):
+    result = optimizer.optimize_portfolio(dict(base_inputs, num_simulations=num_simulations))
+    assert "Number of simulations" in result["error"]
+
+
+def test_simulation_count_defaults_when_unset(optimizer):
+    assert optimizer.simulation_count({}) == optimizer.NUM_SIMULATIONS
+    assert optimizer.simulation_count({"num_simulations": 2000}) == 2000
+
+
+def test_correlated_mode_honours_paths_and_percentiles(optimizer, base_inputs):
+    inputs = dict(base_inputs, simulation_mode="correlated", num_simulations=3000, seed=1, percentiles=[25, 75])
+    weights, _ = optimizer.allocate_assets(inputs)
+    mc_results = optimizer.run_monte_carlo(inputs, 0.1, 0.15, weights, keep_values=True)
+    assert len(mc_results["final_values"]) == 3000
+    assert set(mc_results["percentiles"]) == {"p25", "p75"}
+    assert mc_results["percentile_5"] < mc_results["percentiles"]["p25"] < mc_results["percentiles"]["p75"]
+
+
+def differences(expected, actual, path=""):
+    """Paths at which two results differ beyond floating-point rescaling error"""
+    if isinstance(expected, dict):
+        if set(expected) != set(actual):
+            return [f"{path}: keys {sorted(set(expected) ^ set(actual))}"]
+        return [d for key in expected for d in differences(expected[key], actual[key], f"{path}/{key}")]
+    if isinstance(expected, list):
+        if len(expected) != len(actual):
+            return [f"{path}: length {len(expected)} vs {len(actual)}"]
+        return [d for i, (e, a) in enumerate(zip(expected, actual)) for d in differences(e, a, f"{path}[{i}]")]
+    if isinstance(expected, (int, float, np.number)) and not isinstance(expected, bool) and actual is not None:
+        return [] if np.isclose(expected, actual, rtol=1e-9, atol=1e-6) else [f"{path}: {expected} vs {actual}"]
+    return [] if expected == actual else [f"{path}: {expected} vs {actual}"]
+
+
+@pytest.mark.parametrize("options", [
+    {"seed": 5},
+    {"seed": 5, "histogram": True},
+    {"seed": 5, "simulation_mode": "monthly", "monthly_contribution": 5000},
+    {"seed": 5, "simulation_mode": "bootstrap"},
+    {"seed": 5, "simulation_mode": "correlated", "percentiles": [25]},
+    {"seed": 5, "variance_reduction": "antithetic", "control_variate": True}
+], ids=["blended", "histogram", "monthly", "bootstrap", "correlated", "variance_reduced"])
+def test_optimize_many_rows_match_single_calls(optimizer, options):
+    batch = optimizer.optimize_many(ROWS, options)
+    assert len(batch) == len(ROWS)
+    for row, result in zip(ROWS, batch):
+        single = optimizer.optimize_portfolio(dict(row, **options))
+        assert differences(single, result) == []
+
+
+def test_optimize_many_rejects_fractional_horizons_per_row(optimizer):
+    results = optimizer.optimize_many([BASE_INPUTS, dict(BASE_INPUTS, investment_horizon=10.5)], {"seed": 1})
+    assert "error" not in results[0]
+    assert results[1]["error"] == "Investment horizon must be a whole number of years."
+
+
+@pytest.mark.parametrize("risk_tolerance", ["conservative", "moderate", "aggressive"])
+def test_frontier_allocation_stays_within_the_volatility_cap(optimizer, base_inputs, risk_tolerance):
+    inputs = dict(base_inputs, risk_tolerance=risk_tolerance, financial_goal=5000000)
+    weights, _ = optimizer.allocate_assets_frontier(inputs)
+    weight_vector = optimizer.universe.weights_vector(weights)
+    # The cap applies to covariance volatility, not the weighted-average figure in the results
+    volatility = np.sqrt(weight_vector @ optimizer.get_covariance_matrix() @ weight_vector)
+    assert weight_vector.sum() == pytest.approx(1)
+    assert volatility <= optimizer.RISK_VOLATILITY_CAPS[risk_tolerance] + 1e-3
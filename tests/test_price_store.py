@@ -0,0 +1,110 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from price_store import PriceStore
+
+
+class FakeFetch:
+    """Business-day bars for any range, recording every request"""
+
+    def __init__(self, empty=()):
+        self.calls = []
+        self.empty = set(empty)
+
+    def __call__(self, ticker, start_date, end_date, timeout=None):
+        self.calls.append((ticker, start_date, end_date))
+        if ticker in self.empty:
+            return pd.DataFrame()
+        index = pd.bdate_range(start_date, end_date, inclusive="left")
+        return pd.DataFrame({"Close": [float(d.toordinal()) for d in index]}, index=index)
+
+
+@pytest.fixture
+def fetch():
+    return FakeFetch(empty={"GONE.NS"})
+
+
+def test_first_read_downloads_the_range(tmp_path, fetch):
+    store = PriceStore(str(tmp_path), fetch)
+    bars = store.history("AAA.NS", "2024-01-01", "2024-02-01")
+    assert fetch.calls == [("AAA.NS", "2024-01-01", "2024-02-01")]
+    assert bars.index.min() >= pd.Timestamp("2024-01-01") and bars.index.max() < pd.Timestamp("2024-02-01")
+    assert store.last_cached_date("AAA.NS") == "2024-01-31"
+
+
+def test_covered_range_is_served_from_disk(tmp_path, fetch):
+    store = PriceStore(str(tmp_path), fetch)
+    store.history("AAA.NS", "2024-01-01", "2024-02-01")
+    fetch.calls.clear()
+    bars = store.history("AAA.NS", "2024-01-10", "2024-01-20")
+    assert fetch.calls == []
+    assert len(bars) == len(pd.bdate_range("2024-01-10", "2024-01-20", inclusive="left"))
+
+
+def test_later_read_fetches_only_the_tail(tmp_path, fetch):
+    store = PriceStore(str(tmp_path), fetch)
+    store.history("AAA.NS", "2024-01-01", "2024-02-01")
+    fetch.calls.clear()
+    bars = store.history("AAA.NS", "2024-01-01", "2024-02-15")
+    # Restarts at the last cached bar to pick up late revisions
+    assert fetch.calls == [("AAA.NS", "2024-01-31", "2024-02-15")]
+    pd.testing.assert_index_equal(bars.index, pd.bdate_range("2024-01-01", "2024-02-15", inclusive="left",
+                                                             name="Date"), check_names=False)
+    assert not bars.index.duplicated().any()
+
+
+def test_earlier_start_refetches_the_whole_range(tmp_path, fetch):
+    store = PriceStore(str(tmp_path), fetch)
+    store.history("AAA.NS", "2024-01-01", "2024-02-01")
+    fetch.calls.clear()
+    store.history("AAA.NS", "2023-12-01", "2024-02-01")
+    assert fetch.calls == [("AAA.NS", "2023-12-01", "2024-02-01")]
+
+
+def test_ticker_without_bars_is_not_refetched(tmp_path, fetch):
+    store = PriceStore(str(tmp_path), fetch)
+    assert store.history("GONE.NS", "2024-01-01", "2024-02-01").empty
+    assert store.history("GONE.NS", "2024-01-01", "2024-02-01").empty
+    assert len(fetch.calls) == 1
+
+
+def test_lost_file_is_refetched(tmp_path, fetch):
+    store = PriceStore(str(tmp_path), fetch)
+    store.history("AAA.NS", "2024-01-01", "2024-02-01")
+    os.remove(store.path("AAA.NS"))
+    fetch.calls.clear()
+    assert not store.history("AAA.NS", "2024-01-01", "2024-02-01").empty
+    assert fetch.calls == [("AAA.NS", "2024-01-01", "2024-02-01")]
+
+
+def test_offline_mode_reads_disk_only(tmp_path, fetch):
+    PriceStore(str(tmp_path), fetch).history("AAA.NS", "2024-01-01", "2024-02-01")
+    fetch.calls.clear()
+    offline = PriceStore(str(tmp_path), fetch, offline=True)
+    assert len(offline.history("AAA.NS", "2024-01-01", "2024-03-01")) == 23
+    assert offline.history("BBB.NS", "2024-01-01", "2024-03-01").empty
+    assert fetch.calls == []
+
+
+def test_store_without_fetch_is_offline(tmp_path):
+    pd.DataFrame({"Close": [1.0, 2.0]}, index=pd.to_datetime(["2024-01-02", "2024-01-03"])).to_csv(
+        tmp_path / "FIXTURE.NS.csv"
+    )
+    assert list(PriceStore(str(tmp_path)).history("FIXTURE.NS", "2024-01-01", "2024-02-01")["Close"]) == [1.0, 2.0]
+
+
+def test_stores_sharing_a_root_keep_each_others_manifest_entries(tmp_path, fetch):
+    first, second = PriceStore(str(tmp_path), fetch), PriceStore(str(tmp_path), fetch)
+    first.history("AAA.NS", "2024-01-01", "2024-02-01")
+    second.history("BBB.NS", "2024-01-01", "2024-02-01")
+    with open(tmp_path / PriceStore.MANIFEST, encoding="utf-8") as f:
+        assert set(json.load(f)) == {"AAA.NS", "BBB.NS"}
+
+    fetch.calls.clear()
+    second.history("AAA.NS", "2024-01-01", "2024-02-01")
+    first.history("BBB.NS", "2024-01-01", "2024-02-01")
+    assert fetch.calls == []
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
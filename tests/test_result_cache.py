@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from result_cache import StaleWhileRevalidateCache
+
+
+class Counter:
+    """compute() stand-in that counts calls and can be held until released"""
+
+    def __init__(self, values=None, hold=False):
+        self.values = list(values or [])
+        self.calls = 0
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        value = self.values.pop(0) if self.values else self.calls
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+def wait_for_refresh(cache):
+    deadline = time.time() + 5
+    while cache.stats()['refreshing'] and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_miss_then_fresh_hit():
+    cache, compute = StaleWhileRevalidateCache(), Counter()
+    assert cache.get('k', 1, compute)[1]['status'] == 'miss'
+    value, info = cache.get('k', 1, compute)
+    assert (value, info['status'], compute.calls) == (1, 'fresh', 1)
+
+
+def test_concurrent_misses_share_one_computation():
+    cache, compute = StaleWhileRevalidateCache(), Counter(hold=True)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('k', 1, compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    compute.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert compute.calls == 1
+    assert {value for value, _ in results} == {1}
+    assert sorted(info['status'] for _, info in results) == ['coalesced'] * 7 + ['miss']
+
+
+def test_new_version_serves_stale_value_during_one_background_refresh():
+    cache, compute = StaleWhileRevalidateCache(), Counter(['old', 'new'])
+    cache.get('k', 1, compute)
+    compute.release.clear()
+
+    stale = [cache.get('k', 2, compute) for _ in range(5)]
+    assert all(value == 'old' and info['status'] == 'stale' for value, info in stale)
+    compute.release.set()
+    wait_for_refresh(cache)
+
+    value, info = cache.get('k', 2, compute)
+    assert (value, info['status'], info['data_version'], compute.calls) == ('new', 'fresh', 2, 2)
+
+
+def test_expired_entry_is_stale():
+    cache, compute = StaleWhileRevalidateCache(ttl_seconds=0.05), Counter()
+    cache.get('k', 1, compute)
+    time.sleep(0.1)
+    assert cache.get('k', 1, compute)[1]['status'] == 'stale'
+    wait_for_refresh(cache)
+    assert cache.get('k', 1, compute)[0] == 2
+
+
+def test_failed_background_refresh_keeps_the_stale_value():
+    cache, compute = StaleWhileRevalidateCache(), Counter(['old', RuntimeError('offline')])
+    cache.get('k', 1, compute)
+    assert cache.get('k', 2, compute)[0] == 'old'
+    wait_for_refresh(cache)
+    assert cache.stats()['errors'] == 1
+    value, info = cache.get('k', 2, lambda: 'new')
+    assert (value, info['status']) == ('old', 'stale')
+
+
+def test_failed_foreground_computation_raises_and_is_not_cached():
+    cache = StaleWhileRevalidateCache()
+    with pytest.raises(RuntimeError):
+        cache.get('k', 1, Counter([RuntimeError('offline')]))
+    assert cache.get('k', 1, Counter(['ok']))[0] == 'ok'
+
+
+def test_incomplete_value_is_served_but_refreshed_next_time():
+    cache, compute = StaleWhileRevalidateCache(), Counter(['partial', 'full'])
+    complete = lambda value: value == 'full'  # noqa: E731
+    value, info = cache.get('k', 1, compute, complete)
+    assert (value, info['complete']) == ('partial', False)
+
+    value, info = cache.get('k', 1, compute, complete)
+    assert (value, info['status']) == ('partial', 'stale')
+    wait_for_refresh(cache)
+    value, info = cache.get('k', 1, compute, complete)
+    assert (value, info['status'], info['complete']) == ('full', 'fresh', True)
+
+
+@pytest.fixture
+def guide(tmp_path, monkeypatch):
+    pytest.importorskip("yfinance")
+    from investment_guide import InvestmentGuide
+    monkeypatch.setenv('EQUITY_ANALYSIS_DEADLINE', '60')
+    monkeypatch.setenv('EQUITY_MIN_ANALYSIS_DEADLINE', '10')
+    return InvestmentGuide(offline=True, price_cache_dir=str(tmp_path))
+
+
+def test_analyze_equity_cached_clamps_deadlines_and_refreshes_partial_results(guide, monkeypatch):
+    deadlines = []
+
+    def analyze(start_date, end_date, deadline):
+        deadlines.append(deadline)
+        timed_out = ['SLOW.NS'] if len(deadlines) == 1 else []
+        return pd.DataFrame({'Ticker': ['FAST.NS']}), {'timed_out': timed_out, 'failed': {}}
+
+    monkeypatch.setattr(guide, '_analyze_equity', analyze)
+    _, report, info = guide.analyze_equity_cached('2024-01-01', '2024-06-01', 0.001)
+    assert deadlines == [10.0]
+    assert (report['timed_out'], info['complete']) == (['SLOW.NS'], False)
+
+    assert guide.analyze_equity_cached('2024-01-01', '2024-06-01', 10 ** 6)[2]['status'] == 'stale'
+    wait_for_refresh(guide.equity_cache)
+    assert deadlines == [10.0, 60.0]
+    _, report, info = guide.analyze_equity_cached('2024-01-01', '2024-06-01')
+    assert (report['timed_out'], info['status']) == ([], 'fresh')
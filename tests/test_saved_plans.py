@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from saved_plans import PlanStore, SavedPlans
+
+
+class Kind:
+    """Plan compute function with a switchable data version, recording its inputs"""
+
+    def __init__(self):
+        self.version = "v1"
+        self.calls = []
+
+    def __call__(self, inputs):
+        if inputs.get("amount", 0) <= 0:
+            raise ValueError("Amount must be positive.")
+        self.calls.append(inputs)
+        return {"value": inputs["amount"] * 2, "version": self.version, "seed": inputs.get("seed")}
+
+
+@pytest.fixture
+def kind():
+    return Kind()
+
+
+@pytest.fixture
+def plans(tmp_path, kind):
+    saved = SavedPlans(PlanStore(str(tmp_path / "plans.db")))
+    saved.register("portfolio", kind, lambda: kind.version, seeded=True)
+    return saved
+
+
+def test_unchanged_inputs_are_not_recomputed(plans, kind):
+    first = plans.save_plan("asha", "portfolio", {"amount": 10})
+    again = plans.save_plan("asha", "portfolio", {"amount": 10})
+    assert len(kind.calls) == 1
+    assert again["outputs"] == first["outputs"] == {"value": 20, "version": "v1", "seed": first["seed"]}
+    assert plans.get_plan("asha", "portfolio")["updated_at"] == first["updated_at"]
+    assert len(kind.calls) == 1
+
+
+def test_changed_inputs_recompute_with_the_same_seed(plans, kind):
+    first = plans.save_plan("asha", "portfolio", {"amount": 10})
+    second = plans.save_plan("asha", "portfolio", {"amount": 15})
+    assert len(kind.calls) == 2
+    assert second["outputs"]["value"] == 30
+    assert second["seed"] == first["seed"] is not None
+
+
+def test_explicit_seed_is_kept(plans):
+    assert plans.save_plan("asha", "portfolio", {"amount": 10, "seed": 7})["seed"] == 7
+
+
+def test_new_data_version_recomputes_on_read(plans, kind):
+    saved = plans.save_plan("asha", "portfolio", {"amount": 10})
+    kind.version = "v2"
+    plan = plans.get_plan("asha", "portfolio")
+    assert (plan["data_version"], plan["outputs"]["version"]) == ("v2", "v2")
+    assert plan["seed"] == saved["seed"]
+    assert len(kind.calls) == 2
+    plans.get_plan("asha", "portfolio")
+    assert len(kind.calls) == 2
+
+
+def test_refresh_stale_recomputes_only_outdated_plans(plans, kind):
+    plans.save_plan("asha", "portfolio", {"amount": 10})
+    plans.save_plan("ravi", "portfolio", {"amount": 20})
+    assert plans.refresh_stale() == 0
+    kind.version = "v2"
+    assert plans.refresh_stale() == 2
+    assert plans.refresh_stale() == 0
+    assert [p["data_version"] for p in plans.get_user_plans("ravi")] == ["v2"]
+    assert len(kind.calls) == 4
+
+
+def test_background_refresh_coalesces_requests(plans, kind):
+    plans.save_plan("asha", "portfolio", {"amount": 10})
+    kind.version = "v2"
+    for _ in range(5):
+        plans.request_refresh()
+    deadline = time.time() + 5
+    while plans.store.stale("portfolio", "v2") and time.time() < deadline:
+        time.sleep(0.01)
+    assert plans.store.get("asha", "portfolio")["data_version"] == "v2"
+    assert len(kind.calls) == 2
+
+
+def test_invalid_inputs_and_unknown_kinds_raise(plans):
+    with pytest.raises(ValueError):
+        plans.save_plan("asha", "portfolio", {"amount": 0})
+    assert plans.get_plan("asha", "portfolio") is None
+    with pytest.raises(ValueError, match="Unknown plan type"):
+        plans.save_plan("asha", "budget", {"amount": 10})
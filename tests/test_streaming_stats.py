@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from streaming_stats import QuantileSketch
+
+
+@pytest.mark.parametrize("q", [0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0])
+def test_quantile_sketch_within_alpha_of_order_statistic(q):
+    rng = np.random.default_rng(0)
+    values = 100000 * np.exp(rng.normal(0.5, 0.6, 100001))
+    sketch = QuantileSketch(alpha=0.005)
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+
+    ordered = np.sort(values)
+    exact = ordered[int(np.floor(q * (len(values) - 1)))]
+    assert abs(sketch.quantile(q) - exact) <= sketch.alpha * exact
+    # np.percentile with linear interpolation lies between adjacent order statistics
+    assert abs(sketch.quantile(q) - np.percentile(values, 100 * q)) <= 2 * sketch.alpha * exact
+
+
+def test_quantile_sketch_merge_matches_single_sketch():
+    rng = np.random.default_rng(1)
+    parts = [np.exp(rng.normal(0, 1, 5000)) for _ in range(4)]
+    single, merged = QuantileSketch(), QuantileSketch()
+    single.update(np.concatenate(parts))
+    for part in parts:
+        shard = QuantileSketch()
+        shard.update(part)
+        merged.merge(shard)
+
+    assert merged.count == single.count
+    for q in (0.05, 0.5, 0.95):
+        assert merged.quantile(q) == single.quantile(q)
+
+
+def test_quantile_sketch_counts_non_positive_values_as_zero():
+    sketch = QuantileSketch()
+    sketch.update([-5.0, 0.0, 0.0, 10.0])
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(10.0, rel=sketch.alpha)